@@ -1,44 +1,18 @@
-from flask import Flask, request, jsonify
-from main import ask_idc_chatbot
+from flask import Flask, Response, request, jsonify, stream_with_context
+from main import ask_idc_chatbot, ask_idc_chatbot_stream, ingest_documents
 from flask_cors import CORS
+from config import DATABASE_PATH, DB_POOL_SIZE
+from db import ConnectionPool, initialize_database
 import sqlite3
+import json
+import os
 
 app = Flask(__name__)
 CORS(app)
 
-def init_db():
-    """Initialize database with required tables"""
-    import os
-    from config import BACKEND_DIR
-    db_path = os.path.join(BACKEND_DIR, "db", "users.db")
-    
-    # Ensure the db directory exists
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    
-    conn = sqlite3.connect(db_path)
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-    print("Database initialized successfully")
-
-def get_db():
-    import os
-    from config import BACKEND_DIR
-    db_path = os.path.join(BACKEND_DIR, "db", "users.db")
-    
-    # Ensure the db directory exists
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Kept as constants so each pooled connection's statement cache reuses the prepared statements
+USER_EXISTS_SQL = "SELECT 1 FROM users WHERE email = ? LIMIT 1"
+INSERT_USER_SQL = "INSERT INTO users (name, email) VALUES (?, ?)"
 
 @app.route("/")
 def home():
@@ -53,19 +27,22 @@ def register_user():
     if not name or not email:
         return jsonify({"error": "Name and email are required."}), 400
 
-    conn = get_db()
-    try:
-        conn.execute("INSERT INTO users (name, email) VALUES (?, ?)", (name, email))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        return jsonify({"error": "Email already registered."}), 409
-    finally:
-        conn.close()
+    with db_pool.acquire() as conn:
+        try:
+            conn.execute(INSERT_USER_SQL, (name, email))
+            conn.commit()
+        except sqlite3.IntegrityError:
+            return jsonify({"error": "Email already registered."}), 409
 
     return jsonify({"message": "User registered successfully."})
 
-@app.route("/chat", methods=["POST"])
-def chat():
+def parse_chat_request():
+    """
+    Validate a chat request body and check that the user is registered.
+
+    Returns:
+        Tuple of (query, None) on success or (None, error response) on failure
+    """
     data = request.get_json()
     
     # Handle both old and new request formats for backward compatibility
@@ -73,20 +50,51 @@ def chat():
     query = data.get("query") or data.get("message")
 
     if not email or not query:
-        return jsonify({"error": "Email and message are required."}), 400
+        return None, (jsonify({"error": "Email and message are required."}), 400)
 
-    conn = get_db()
-    user = conn.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
-    conn.close()
+    with db_pool.acquire() as conn:
+        user = conn.execute(USER_EXISTS_SQL, (email,)).fetchone()
 
     if not user:
-        return jsonify({"error": "Email not registered."}), 403
+        return None, (jsonify({"error": "Email not registered."}), 403)
+
+    return query, None
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    query, error = parse_chat_request()
+    if error:
+        return error
 
     response = ask_idc_chatbot(query)
     return jsonify({"response": response})
 
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """Stream the chatbot response as Server-Sent Events while Gemini generates it."""
+    query, error = parse_chat_request()
+    if error:
+        return error
+
+    def generate():
+        for chunk in ask_idc_chatbot_stream(query):
+            yield f"data: {json.dumps({'delta': chunk})}\n\n"
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Initialize database on startup
-init_db()
+initialize_database(DATABASE_PATH)
+db_pool = ConnectionPool(DATABASE_PATH, size=DB_POOL_SIZE)
 
 if __name__ == "__main__":
+    # With the debug reloader only the child process (WERKZEUG_RUN_MAIN=true) serves requests,
+    # so models are loaded there rather than in the watcher process. Ingestion runs here at
+    # startup (only if the collection is empty or out of date), never on a request.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        ingest_documents()
     app.run(debug=True, host='0.0.0.0', port=5000)
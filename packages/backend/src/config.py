@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 
 load_dotenv()
 
@@ -13,12 +12,61 @@ DATA_FOLDER = os.path.join(BACKEND_DIR, "data")
 
 CHROMA_DB_PATH = os.path.join(BACKEND_DIR, "chroma_db")
 
+CACHE_DIR = os.path.join(BACKEND_DIR, "cache")
+
+DATABASE_PATH = os.path.join(BACKEND_DIR, "db", "users.db")
+
+DB_POOL_SIZE = 8  # Long-lived SQLite connections shared by Flask request threads
+
 COLLECTION_NAME = "company_data_collection"
 
+# HNSW index settings for the ChromaDB collection (applied when the collection is created)
+CHROMA_HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,  # Graph degree: higher improves recall at build time
+    "hnsw:construction_ef": 200,  # Build-time candidate list: better graph, slower ingestion
+    "hnsw:search_ef": 40  # Query-time candidate list: ample for n_results=5, faster than default
+}
+
+# In-memory int8 (scalar-quantized) FAISS HNSW index used for retrieval; ChromaDB remains the persistent store
+FAISS_INT8_INDEX = {
+    'enabled': True,
+    'M': CHROMA_HNSW_METADATA["hnsw:M"],
+    'ef_construction': CHROMA_HNSW_METADATA["hnsw:construction_ef"],
+    'ef_search': CHROMA_HNSW_METADATA["hnsw:search_ef"],
+    'int8_rescore_vectors': True  # Keep the re-scoring copy of the vectors as int8 (1/4 the memory of float32)
+}
+
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
+# int8 ONNX Runtime export of the embedding model (falls back to FP32 SentenceTransformer)
+EMBEDDING_ONNX = {
+    'enabled': True,
+    'model_dir': os.path.join(BACKEND_DIR, "models", "minilm-onnx-int8"),
+    'max_seq_length': 256  # Same truncation length as the SentenceTransformer model
+}
+
+# Micro-batching of concurrent query encodes from request threads
+QUERY_EMBEDDING_BATCHING = {
+    'max_batch_size': 16,
+    'max_wait_ms': 10,  # How long the first query in a batch waits for others
+    'timeout_s': 2.0  # Encode directly if the batch worker does not answer in time
+}
+
 GEMINI_MODEL_NAME = "gemini-2.5-flash-lite-preview-06-17"
 
+# Generation settings applied to every Gemini call
+GEMINI_GENERATION_CONFIG = {
+    'max_output_tokens': 512,  # A 75+ word answer rarely needs more than ~400 tokens
+    'temperature': 0.2
+}
+
+# Conversation memory sent to Gemini as chat history
+CONVERSATION_MEMORY = {
+    'max_turns': 6,  # Recent question/answer turns kept verbatim
+    'max_summary_topics': 10  # Older questions kept in the summary note
+}
+
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
@@ -30,6 +78,14 @@ if not os.path.exists(CHROMA_DB_PATH):
     os.makedirs(CHROMA_DB_PATH)
     print(f"Created ChromaDB folder: {CHROMA_DB_PATH}")
 
+if not os.path.exists(os.path.dirname(DATABASE_PATH)):
+    os.makedirs(os.path.dirname(DATABASE_PATH))
+    print(f"Created database folder: {os.path.dirname(DATABASE_PATH)}")
+
+if not os.path.exists(CACHE_DIR):
+    os.makedirs(CACHE_DIR)
+    print(f"Created cache folder: {CACHE_DIR}")
+
 # In config.py, add JSON-specific configurations:
 
 # File processing priority (JSON files first, then PPTX for image extraction)
@@ -61,6 +117,9 @@ PPTX_PROCESSING = {
     'use_vlm': True,  # Use VLM for logo recognition
     'ocr_confidence_threshold': 0.6,
     'max_image_size': (1024, 1024),  # Resize large images for processing
+    'min_image_area': 1024,  # Skip spacers and icons smaller than ~32x32 pixels
+    'min_pixel_std': 8.0,  # Skip near-uniform images (solid fills, flat backgrounds)
+    'extraction_workers': min(8, os.cpu_count() or 1),  # Slides decoded in parallel
     'supported_image_formats': ['.png', '.jpg', '.jpeg', '.gif', '.bmp']
 }
 
@@ -70,5 +129,19 @@ OCR_SETTINGS = {
     'min_confidence': 60,
     'preprocess_images': True,
     'enhance_contrast': True,
-    'remove_noise': True
-}
\ No newline at end of file
+    'remove_noise': True,
+    'ocr_workers': min(4, os.cpu_count() or 1),  # Parallel OCR threads, one Tesseract instance each
+    'cache_dir': os.path.join(CACHE_DIR, "ocr"),  # OCR results keyed on image content hash
+    'batch_min_images': 10,  # pytesseract only: OCR this many or more images in one file-list call
+    'stream_window': 32  # Images decoded and held in memory at once while processing a deck
+}
+
+# Semantic response cache settings (repeated questions skip retrieval and Gemini)
+SEMANTIC_CACHE = {
+    'enabled': True,
+    'similarity_threshold': 0.95,  # Minimum cosine similarity for a cache hit
+    'max_entries': 5000,  # Least recently used entries are evicted beyond this size
+    'exact_max_entries': 2048,  # Size of the exact-match tier checked before embedding
+    'flush_every': 100,  # Adds between writes of the FAISS index and response log
+    'cache_dir': os.path.join(CACHE_DIR, "semantic")
+}
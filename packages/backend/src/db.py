@@ -1,13 +1,54 @@
+import queue
 import sqlite3
+from contextlib import closing, contextmanager
+
+# Bump when create_advanced_schema changes; tracked with PRAGMA user_version
+SCHEMA_VERSION = 1
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of long-lived SQLite connections.
+    Avoids a connect/close per request and keeps each connection's page cache warm.
+    """
+
+    def __init__(self, db_path: str, size: int = 8):
+        self.db_path = db_path
+        self._pool = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection configured for concurrent reads from Flask threads."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # Per-connection settings, applied once when the connection is created
+        # (journal_mode=WAL is persistent and set by initialize_database)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-8000")
+        return conn
+
+    @contextmanager
+    def acquire(self):
+        """Check out a connection for the duration of a with-block."""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    def close_all(self):
+        """Close every idle connection in the pool."""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
 
 def create_advanced_schema(db_path=None):
     if db_path is None:
-        import os
-        from config import BACKEND_DIR
-        db_path = os.path.join(BACKEND_DIR, "db", "users.db")
-        
-        # Ensure the db directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        from config import DATABASE_PATH
+        db_path = DATABASE_PATH
     try:
         with sqlite3.connect(db_path) as conn:
             cursor = conn.cursor()
@@ -21,6 +62,7 @@ def create_advanced_schema(db_path=None):
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             );
             """)
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email);")
 
             # Conversations Table
             cursor.execute("""
@@ -47,10 +89,30 @@ def create_advanced_schema(db_path=None):
             """)
 
             print("✅ Database schema created successfully.")
+            return True
     except Exception as e:
         print("❌ Failed to create schema:", e)
+        return False
+
+
+def initialize_database(db_path=None):
+    """
+    Create the schema once per database file.
+    Skips the DDL entirely when PRAGMA user_version shows the schema is current,
+    and enables WAL mode, which persists in the database file.
+    """
+    if db_path is None:
+        from config import DATABASE_PATH
+        db_path = DATABASE_PATH
+
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        if create_advanced_schema(db_path):
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 if __name__ == "__main__":
-    create_advanced_schema()
+    initialize_database()
 
 
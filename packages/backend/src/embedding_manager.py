@@ -1,7 +1,166 @@
 from sentence_transformers import SentenceTransformer
-from config import EMBEDDING_MODEL_NAME
+from config import EMBEDDING_MODEL_NAME, EMBEDDING_ONNX, QUERY_EMBEDDING_BATCHING
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import os
+import queue
+import threading
+import time
+import torch
 import numpy as np
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
+
+# Below this many texts, worker-process startup costs more than it saves
+MULTI_PROCESS_MIN_TEXTS = 512
+
+class QuantizedSentenceEncoder:
+    """
+    int8 ONNX Runtime version of a SentenceTransformer model.
+    Exposes the subset of the SentenceTransformer API used by the backend
+    (encode + get_sentence_embedding_dimension) with mean pooling and optional
+    L2 normalization, matching the original model's outputs.
+    """
+
+    QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+    def __init__(self, model_name: str, model_dir: str, max_seq_length: int = 256):
+        """
+        Load the quantized model, exporting and quantizing it first if needed.
+        
+        Args:
+            model_name: HuggingFace name of the SentenceTransformer model
+            model_dir: Directory holding the quantized ONNX model and tokenizer
+            max_seq_length: Maximum number of tokens per input text
+        """
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        if not os.path.exists(os.path.join(model_dir, self.QUANTIZED_FILE_NAME)):
+            self._export_quantized_model(model_name, model_dir)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.ort_model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir, file_name=self.QUANTIZED_FILE_NAME
+        )
+        self.max_seq_length = max_seq_length
+        self._dimension = self.ort_model.config.hidden_size
+
+    @staticmethod
+    def _export_quantized_model(model_name: str, model_dir: str):
+        """Export the model to ONNX and apply dynamic int8 quantization (VNNI kernels)."""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        print(f"Exporting {model_name} to int8 ONNX at {model_dir} (one-time setup)...")
+        fp32_model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        quantizer = ORTQuantizer.from_pretrained(fp32_model)
+        quantization_config = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=model_dir, quantization_config=quantization_config)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               show_progress_bar: bool = False, normalize_embeddings: bool = False,
+               **kwargs) -> np.ndarray:
+        """
+        Encode texts into mean-pooled sentence embeddings.
+        
+        Args:
+            sentences: A text or list of texts
+            batch_size: Number of texts per ONNX Runtime call
+            show_progress_bar: Display a progress bar over batches
+            normalize_embeddings: L2-normalize the output vectors
+            
+        Returns:
+            numpy array of shape (n, dimension), or (dimension,) for a single text
+        """
+        single_input = isinstance(sentences, str)
+        if single_input:
+            sentences = [sentences]
+
+        # Smart batching: group similar lengths so each batch pads to a similar size
+        length_order = np.argsort([-len(text) for text in sentences], kind='stable')
+        sentences = [sentences[i] for i in length_order]
+
+        batch_starts = range(0, len(sentences), batch_size)
+        if show_progress_bar:
+            from tqdm import tqdm
+            batch_starts = tqdm(batch_starts, desc="Batches")
+
+        batches = []
+        for start in batch_starts:
+            features = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            token_embeddings = self.ort_model(**features).last_hidden_state
+
+            # Mean pooling over non-padding tokens
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            if normalize_embeddings:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+
+        embeddings = np.vstack(batches) if batches else np.empty((0, self._dimension), dtype=np.float32)
+        embeddings = embeddings[np.argsort(length_order)]  # Restore input order
+        return embeddings[0] if single_input else embeddings
+
+
+class QueryEmbeddingBatcher:
+    """
+    Collects single-query encode requests from concurrent threads and encodes them together.
+    A worker thread waits up to max_wait_ms (or until max_batch_size queries arrive),
+    runs one batched encode and resolves each caller's future with its own row.
+    """
+
+    def __init__(self, encode_batch, max_batch_size: int = 16, max_wait_ms: float = 10):
+        """
+        Args:
+            encode_batch: Callable mapping a list of texts to an (n, dimension) array
+            max_batch_size: Maximum number of queries encoded per call
+            max_wait_ms: Maximum time the first query in a batch waits for others
+        """
+        self._encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for encoding; the returned future resolves to its embedding."""
+        future = Future()
+        self._requests.put((text, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                embeddings = self._encode_batch([text for text, _ in batch])
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
 
 class EmbeddingManager:
     """
@@ -12,23 +171,95 @@ class EmbeddingManager:
     def __init__(self):
         """Initialize embedding manager and load the model."""
         self.model = None
+        self._query_batcher = None
+        self._batcher_lock = threading.Lock()
         self._load_model()
 
     def _load_model(self):
-        """Load the SentenceTransformer model for creating embeddings."""
+        """Load the embedding model, preferring the int8 ONNX export over FP32 PyTorch."""
+        if EMBEDDING_ONNX['enabled']:
+            try:
+                self.model = QuantizedSentenceEncoder(
+                    EMBEDDING_MODEL_NAME,
+                    EMBEDDING_ONNX['model_dir'],
+                    max_seq_length=EMBEDDING_ONNX['max_seq_length']
+                )
+                print(f"Loaded int8 ONNX embedding model: {EMBEDDING_MODEL_NAME}")
+                return
+            except ImportError:
+                print("optimum/onnxruntime not installed, using FP32 SentenceTransformer.")
+            except Exception as e:
+                print(f"Could not load int8 ONNX embedding model ({e}), using FP32 SentenceTransformer.")
+
         try:
             print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}")
             self.model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+            self.model.eval()
+            # MiniLM is robust to fp16; only worth it on GPU (CPU fp16 GEMMs are slow)
+            if torch.cuda.is_available():
+                self.model = self.model.half().to('cuda')
             print(f"Loaded embedding model: {EMBEDDING_MODEL_NAME}")
         except Exception as e:
             print(f"Error loading embedding model: {e}")
             print("Please ensure you have internet connection or the model is cached locally.")
             self.model = None
 
-    def get_model(self) -> Optional[SentenceTransformer]:
-        """Get the loaded SentenceTransformer model."""
+    def get_model(self) -> Optional[Union[SentenceTransformer, QuantizedSentenceEncoder]]:
+        """Get the loaded embedding model."""
         return self.model
 
+    def get_dimension(self) -> Optional[int]:
+        """Get the dimension of the embeddings produced by the loaded model."""
+        if not self.model:
+            return None
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        """
+        Encode texts without autograd bookkeeping.
+        
+        Args:
+            texts: Texts to encode
+            **kwargs: Passed through to the model's encode method
+            
+        Returns:
+            numpy array of embeddings
+        """
+        with torch.inference_mode():
+            return self.model.encode(texts, **kwargs)
+
+    def encode_query(self, query: str) -> Optional[np.ndarray]:
+        """
+        Encode a single query into a normalized embedding vector.
+        
+        Args:
+            query: User's search query
+            
+        Returns:
+            numpy array of shape (dimension,) or None if model not loaded
+        """
+        if not self.model:
+            return None
+
+        future = self._get_query_batcher().submit(query)
+        try:
+            return future.result(timeout=QUERY_EMBEDDING_BATCHING['timeout_s'])
+        except FutureTimeoutError:
+            print("Query embedding batch timed out, encoding directly.")
+            return self.encode([query], normalize_embeddings=True)[0]
+
+    def _get_query_batcher(self) -> QueryEmbeddingBatcher:
+        """Start the query batcher on first use (after any worker-process fork)."""
+        if self._query_batcher is None:
+            with self._batcher_lock:
+                if self._query_batcher is None:
+                    self._query_batcher = QueryEmbeddingBatcher(
+                        lambda texts: self.encode(texts, batch_size=len(texts), normalize_embeddings=True),
+                        max_batch_size=QUERY_EMBEDDING_BATCHING['max_batch_size'],
+                        max_wait_ms=QUERY_EMBEDDING_BATCHING['max_wait_ms']
+                    )
+        return self._query_batcher
+
     def create_embeddings(self, chunks: List[Dict[str, str]]) -> Optional[np.ndarray]:
         """
         Generate dense vector embeddings for text chunks.
@@ -52,16 +283,68 @@ class EmbeddingManager:
         
         try:
             print(f"Generating embeddings for {len(texts)} chunks...")
-            # Create embeddings with progress bar
-            embeddings = self.model.encode(
-                texts, 
-                show_progress_bar=True,
-                batch_size=32,  # Process in batches for efficiency
-                normalize_embeddings=True  # Normalize for better similarity search
-            )
+            use_gpu = torch.cuda.is_available()
+            if not use_gpu:
+                torch.set_num_threads(os.cpu_count())
+
+            encode_kwargs = {
+                'show_progress_bar': True,
+                'batch_size': 128 if use_gpu else 64,  # Length-sorted batches keep padding low
+                'normalize_embeddings': True  # Normalize for better similarity search
+            }
+            if isinstance(self.model, SentenceTransformer):
+                # SentenceTransformer sorts each call by length internally
+                encode_kwargs['convert_to_numpy'] = True
+                encode_kwargs['device'] = 'cuda' if use_gpu else 'cpu'
+
+            # The default int8 ONNX model always encodes in-process. Only the FP32 SentenceTransformer
+            # fallback shards large CPU-only jobs across single-threaded worker processes.
+            if isinstance(self.model, SentenceTransformer) and not use_gpu and len(texts) > MULTI_PROCESS_MIN_TEXTS:
+                embeddings = self._encode_multi_process(texts)
+            else:
+                embeddings = self.encode(texts, **encode_kwargs)
             print(f"Generated {len(embeddings)} embeddings.")
             return embeddings
             
         except Exception as e:
             print(f"Error creating embeddings: {e}")
             return None
+
+    def _encode_multi_process(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts with one single-threaded SentenceTransformer worker process per CPU core.
+        Only used for the FP32 fallback model; the default int8 ONNX model encodes in-process
+        and ONNX Runtime already spreads each batch across all cores.
+        
+        Args:
+            texts: Texts to encode
+            
+        Returns:
+            numpy array of normalized embeddings
+        """
+        cpu_count = os.cpu_count() or 1
+        print(f"Encoding with {cpu_count} single-threaded worker processes...")
+
+        # Spawned workers size their torch thread pools from these variables when torch loads;
+        # without them every worker would start cpu_count threads and oversubscribe the cores
+        thread_vars = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS')
+        saved_env = {name: os.environ.get(name) for name in thread_vars}
+        os.environ.update({name: '1' for name in thread_vars})
+        try:
+            pool = self.model.start_multi_process_pool(target_devices=['cpu'] * cpu_count)
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+        try:
+            embeddings = self.model.encode_multi_process(texts, pool, batch_size=32)
+        finally:
+            self.model.stop_multi_process_pool(pool)
+        
+        # Older sentence-transformers releases do not take normalize_embeddings here, so normalize in place
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
@@ -1,8 +1,68 @@
 import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL_NAME, IDC_CONTACT_EMAIL
-from langchain.memory import ConversationBufferMemory
-from langchain_core.messages import HumanMessage, AIMessage
-from typing import List, Optional
+from config import GEMINI_API_KEY, GEMINI_MODEL_NAME, GEMINI_GENERATION_CONFIG, IDC_CONTACT_EMAIL, CONVERSATION_MEMORY
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+from text_matching import PhraseMatcher
+
+# System instruction for the chatbot, sent once via the model's system_instruction
+SYSTEM_INSTRUCTION = (
+    "You are a helpful and professional assistant for IDC Technologies. "
+    "Answer questions based ONLY on the provided context. "
+    "Provide comprehensive answers (aim for 75+ words when context allows). "
+    "Always mention the sources of your information. "
+    f"If the answer is not in the context, politely state you don't have that information and suggest contacting IDC directly at {IDC_CONTACT_EMAIL} for more detailed assistance. "
+    "Be friendly, polite, and professional in your responses."
+)
+
+# Responses returned when Gemini fails; these should never be cached
+NO_ANSWER_RESPONSE = f"I apologize, but I couldn't generate a clear answer based on the available information. For more detailed assistance, please contact IDC directly at {IDC_CONTACT_EMAIL}."
+TECHNICAL_ISSUE_RESPONSE = f"I'm sorry, I encountered a technical issue while processing your question. Please try again or contact IDC directly at {IDC_CONTACT_EMAIL} for assistance."
+
+# Trigger phrases for common queries, in priority order, and their direct responses
+COMMON_QUERY_PHRASES = {
+    "contact": [
+        "how can i contact idc", "how to contact idc", "how do i contact idc",
+        "idc contact", "contact information", "idc phone", "idc email"
+    ],
+    "about": ["who are you", "what do you do", "about idc"]
+}
+COMMON_QUERY_RESPONSES = {
+    "contact": f"You can contact IDC Technologies in several ways:\n\n• Email: {IDC_CONTACT_EMAIL}\n• Visit our 'Contact Us' page on the website\n\nOur team will be happy to assist you with your inquiries!",
+    "about": "IDC Technologies is a global leader in IT staffing and workforce solutions, delivering talent across multiple industries with permanent, temporary, and temporary-to-permanent employment opportunities."
+}
+
+class ConversationMemory:
+    """
+    Bounded conversation memory for Gemini chat sessions.
+    Keeps the most recent turns verbatim; questions from older turns are folded
+    into a short summary note so the prompt size stays flat as the chat grows.
+    """
+
+    def __init__(self, max_turns: int = 6, max_summary_topics: int = 10):
+        self.turns = deque(maxlen=max_turns)  # (user question, model answer) pairs
+        self.earlier_topics = deque(maxlen=max_summary_topics)
+
+    def save(self, user_text: str, model_text: str):
+        """Record a question/answer turn, summarizing the oldest turn if the buffer is full."""
+        if len(self.turns) == self.turns.maxlen:
+            evicted_question, _ = self.turns[0]
+            self.earlier_topics.append(evicted_question)
+        self.turns.append((user_text, model_text))
+
+    def summary(self) -> str:
+        """Single note describing turns that no longer fit in the buffer."""
+        if not self.earlier_topics:
+            return ""
+        return "Earlier in this conversation the user asked about: " + "; ".join(self.earlier_topics)
+
+    def to_gemini(self) -> List[Dict]:
+        """Convert the buffered turns to Gemini chat history format."""
+        return [
+            {"role": role, "parts": [{"text": text}]}
+            for user_text, model_text in self.turns
+            for role, text in (("user", user_text), ("model", model_text))
+        ]
+
 
 class LLMManager:
     """
@@ -14,6 +74,11 @@ class LLMManager:
         """Initialize Gemini model and conversation memory."""
         self.model = None
         self.memory = None
+        self.gen_config = None
+        # One matcher over all trigger phrases, tagged by category: a single scan per query
+        self._common_query_matcher = PhraseMatcher({
+            phrase: category for category, phrases in COMMON_QUERY_PHRASES.items() for phrase in phrases
+        })
         self._initialize_gemini()
 
     def _initialize_gemini(self):
@@ -26,12 +91,21 @@ class LLMManager:
         try:
             # Configure Gemini API
             genai.configure(api_key=GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+            # Output cap and sampling settings, attached to the model so every chat message uses them
+            self.gen_config = genai.types.GenerationConfig(**GEMINI_GENERATION_CONFIG)
+            self.model = genai.GenerativeModel(
+                GEMINI_MODEL_NAME,
+                system_instruction=SYSTEM_INSTRUCTION,
+                generation_config=self.gen_config
+            )
             print(f"Loaded Gemini model: {GEMINI_MODEL_NAME}")
 
             # Initialize conversation memory
-            self.memory = ConversationBufferMemory(return_messages=True)
-            print("ConversationBufferMemory initialized.")
+            self.memory = ConversationMemory(
+                max_turns=CONVERSATION_MEMORY['max_turns'],
+                max_summary_topics=CONVERSATION_MEMORY['max_summary_topics']
+            )
+            print("Conversation memory initialized.")
 
         except Exception as e:
             print(f"Error initializing Gemini: {e}")
@@ -40,22 +114,61 @@ class LLMManager:
 
     def _handle_common_queries(self, query: str) -> Optional[str]:
         """Handle common predefined queries with direct responses."""
-        lower_query = query.lower()
+        # Single pass over the query collects every matched category;
+        # contact queries take priority over company overview queries
+        matched = self._common_query_matcher.find(query)
+        for category in COMMON_QUERY_PHRASES:
+            if category in matched:
+                return COMMON_QUERY_RESPONSES[category]
         
-        # Contact information queries
-        contact_phrases = [
-            "how can i contact idc", "how to contact idc", "how do i contact idc",
-            "idc contact", "contact information", "idc phone", "idc email"
-        ]
-        if any(phrase in lower_query for phrase in contact_phrases):
-            return f"You can contact IDC Technologies in several ways:\n\n• Email: {IDC_CONTACT_EMAIL}\n• Visit our 'Contact Us' page on the website\n\nOur team will be happy to assist you with your inquiries!"
+        return None
+
+    def try_canned(self, query: str) -> Optional[str]:
+        """
+        Return the predefined response for a common query, or None.
+        Called before retrieval so these queries skip embedding and search entirely;
+        canned responses are stateless and are not saved to conversation memory.
+        """
+        return self._handle_common_queries(query)
+
+    def _get_direct_response(self, query: str, context: List[str]) -> Optional[str]:
+        """
+        Return a response that needs no Gemini call (not initialized or no
+        retrieved context), saving it to memory where appropriate.
+        """
+        # Check if components are properly initialized
+        if not self.model or not self.memory:
+            return "I'm sorry, the chatbot system is not fully initialized. Please try again later."
         
-        # Company overview queries
-        if any(phrase in lower_query for phrase in ["who are you", "what do you do", "about idc"]):
-            return "IDC Technologies is a global leader in IT staffing and workforce solutions, delivering talent across multiple industries with permanent, temporary, and temporary-to-permanent employment opportunities."
+        # Prepare context text for LLM
+        if not context:
+            fallback_response = f"I don't have enough information in my knowledge base to answer that question. Please try asking about IDC's services, global presence, or employment opportunities.\n\nFor more detailed assistance, you can contact IDC directly at {IDC_CONTACT_EMAIL}."
+            self.memory.save(query, fallback_response)
+            return fallback_response
         
         return None
 
+    def _start_chat(self, query: str, context: List[str]):
+        """
+        Start a Gemini chat session seeded with conversation memory.
+        
+        Returns:
+            Tuple of (chat session, prompt containing the RAG context and question)
+        """
+        # Add current query with context, plus a note summarizing turns outside the buffer
+        conversation_summary = self.memory.summary()
+        current_prompt = (
+            (f"{conversation_summary}\n\n" if conversation_summary else "") +
+            f"Context Information:\n" + 
+            "\n---\n".join(context) + 
+            f"\n\nUser Question: {query}\n\n" +
+            "Please provide a helpful, comprehensive answer based on the context above:"
+        )
+        
+        # The system instruction is attached to the model, and history holds only
+        # the plain questions/answers (not previous RAG context)
+        return self.model.start_chat(history=self.memory.to_gemini()), current_prompt
+
     def generate_response(self, query: str, context: List[str]) -> str:
         """
         Generate a response using Gemini LLM with RAG context and conversation memory.
@@ -67,75 +180,75 @@ class LLMManager:
         Returns:
             Generated response from Gemini
         """
-        # Check if components are properly initialized
-        if not self.model or not self.memory:
-            return "I'm sorry, the chatbot system is not fully initialized. Please try again later."
-        
-        # Handle common queries with predefined responses
-        common_response = self._handle_common_queries(query)
-        if common_response:
-            self.memory.save_context({"input": query}, {"output": common_response})
-            return common_response
-        
-        # Prepare context text for LLM
-        if not context:
-            fallback_response = f"I don't have enough information in my knowledge base to answer that question. Please try asking about IDC's services, global presence, or employment opportunities.\n\nFor more detailed assistance, you can contact IDC directly at {IDC_CONTACT_EMAIL}."
-            self.memory.save_context({"input": query}, {"output": fallback_response})
-            return fallback_response
+        direct_response = self._get_direct_response(query, context)
+        if direct_response is not None:
+            return direct_response
         
         try:
-            # Get conversation history
-            chat_history_messages = self.memory.load_memory_variables({})["history"]
-            
-            # Convert LangChain messages to Gemini format
-            gemini_chat_history = []
-            for msg in chat_history_messages:
-                if isinstance(msg, HumanMessage):
-                    gemini_chat_history.append({"role": "user", "parts": [{"text": msg.content}]})
-                elif isinstance(msg, AIMessage):
-                    gemini_chat_history.append({"role": "model", "parts": [{"text": msg.content}]})
-            
-            # System instruction for the chatbot
-            system_instruction = (
-                "You are a helpful and professional assistant for IDC Technologies. "
-                "Answer questions based ONLY on the provided context. "
-                "Provide comprehensive answers (aim for 75+ words when context allows). "
-                "Always mention the sources of your information. "
-                f"If the answer is not in the context, politely state you don't have that information and suggest contacting IDC directly at {IDC_CONTACT_EMAIL} for more detailed assistance. "
-                "Be friendly, polite, and professional in your responses."
-            )
-            
-            # Build the conversation payload for Gemini
-            contents_payload = [{"role": "user", "parts": [{"text": system_instruction}]}]
-            contents_payload.extend(gemini_chat_history)
-            
-            # Add current query with context
-            current_prompt = (
-                f"Context Information:\n" + 
-                "\n---\n".join(context) + 
-                f"\n\nUser Question: {query}\n\n" +
-                "Please provide a helpful, comprehensive answer based on the context above:"
-            )
-            contents_payload.append({"role": "user", "parts": [{"text": current_prompt}]})
+            chat, current_prompt = self._start_chat(query, context)
             
             # Generate response from Gemini
             print("Generating response with Gemini...")
-            response = self.model.generate_content(contents_payload)
+            response = chat.send_message(current_prompt)
             
             # Extract response text
             bot_response = ""
             if response.candidates and response.candidates[0].content.parts:
                 bot_response = response.candidates[0].content.parts[0].text
             else:
-                bot_response = f"I apologize, but I couldn't generate a clear answer based on the available information. For more detailed assistance, please contact IDC directly at {IDC_CONTACT_EMAIL}."
+                bot_response = NO_ANSWER_RESPONSE
             
             print("Response generated successfully.")
             
         except Exception as e:
             print(f"Error generating Gemini response: {e}")
-            bot_response = f"I'm sorry, I encountered a technical issue while processing your question. Please try again or contact IDC directly at {IDC_CONTACT_EMAIL} for assistance."
+            bot_response = TECHNICAL_ISSUE_RESPONSE
         
         # Save conversation to memory
-        self.memory.save_context({"input": query}, {"output": bot_response})
+        self.memory.save(query, bot_response)
+        
+        return bot_response
+
+    def stream_response(self, query: str, context: List[str]) -> Iterator[str]:
+        """
+        Stream a response from Gemini chunk by chunk as it is generated.
+        
+        Args:
+            query: User's question
+            context: List of relevant document contexts
+            
+        Yields:
+            Text chunks of the response; the full response is saved to memory once complete
+        """
+        direct_response = self._get_direct_response(query, context)
+        if direct_response is not None:
+            yield direct_response
+            return
         
-        return bot_response
\ No newline at end of file
+        streamed_chunks = []
+        try:
+            chat, current_prompt = self._start_chat(query, context)
+            
+            print("Streaming response with Gemini...")
+            for chunk in chat.send_message(current_prompt, stream=True):
+                if chunk.candidates and chunk.candidates[0].content.parts:
+                    text = chunk.candidates[0].content.parts[0].text
+                    if text:
+                        streamed_chunks.append(text)
+                        yield text
+            
+            if not streamed_chunks:
+                streamed_chunks.append(NO_ANSWER_RESPONSE)
+                yield NO_ANSWER_RESPONSE
+            
+            print("Response streamed successfully.")
+            
+        except Exception as e:
+            print(f"Error streaming Gemini response: {e}")
+            # Keep whatever was already sent and close with the error message
+            error_chunk = f"\n\n{TECHNICAL_ISSUE_RESPONSE}" if streamed_chunks else TECHNICAL_ISSUE_RESPONSE
+            streamed_chunks.append(error_chunk)
+            yield error_chunk
+        
+        # Save conversation to memory
+        self.memory.save(query, "".join(streamed_chunks))
@@ -47,9 +47,6 @@ def suppress_third_party_warnings():
     # Suppress sentence-transformers warnings
     warnings.filterwarnings("ignore", category=UserWarning, module="sentence_transformers")
     
-    # Suppress LangChain deprecation warnings for memory
-    warnings.filterwarnings("ignore", category=DeprecationWarning, module="langchain")
-    
     # Suppress TensorFlow/PyTorch info messages
     os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
     
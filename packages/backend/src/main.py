@@ -1,9 +1,17 @@
-from config import DATA_FOLDER, GEMINI_API_KEY, IDC_CONTACT_EMAIL
+from config import DATA_FOLDER, GEMINI_API_KEY, IDC_CONTACT_EMAIL, SEMANTIC_CACHE
 from data_loader import load_documents_from_folder
 from text_processor import chunk_text
 from embedding_manager import EmbeddingManager
 from vector_db_manager import VectorDBManager
-from llm_manager import LLMManager
+from llm_manager import LLMManager, NO_ANSWER_RESPONSE, TECHNICAL_ISSUE_RESPONSE
+from response_cache import (
+    ExactResponseCache, SemanticResponseCache, normalize_query, is_context_dependent, corpus_fingerprint
+)
+from collections import Counter
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+import threading
+import time
 import os
 
 # Initialize clean logging
@@ -17,26 +25,43 @@ except ImportError:
 _embedding_manager = None
 _vector_db_manager = None
 _llm_manager = None
+_response_cache = None
+_exact_cache = ExactResponseCache()
+
+# Components are loaded lazily, once per process (e.g. per gunicorn worker).
+# A failed load is retried on a later request after a growing backoff.
+_init_lock = threading.Lock()
+_init_succeeded = False
+_next_init_attempt = 0.0
+_init_backoff = 0.0
+_INIT_BACKOFF_START = 5.0   # Seconds before the first retry
+_INIT_BACKOFF_MAX = 300.0
+
+# Response tier hit counters (tier0 = exact, canned = common query, tier1 = semantic, tier2 = full RAG)
+_cache_stats = Counter()
 
 # Configuration flags
 _SINGLE_FILE_TO_DEBUG = None
-_FORCE_CHROMA_REINGESTION = True
 
-def _init_rag_chatbot_components():
+def _load_rag_components() -> bool:
     """
-    Initializes the RAG chatbot components using ChromaDB for vector storage.
-    Loads JSON/JSONL documents, creates embeddings, and stores them in ChromaDB.
+    Load the embedding model, LLM and ChromaDB collection for serving queries.
+    Does not ingest documents; see ingest_documents for that.
+
+    Returns:
+        True if every core component loaded
     """
-    global _embedding_manager, _vector_db_manager, _llm_manager
+    global _embedding_manager, _vector_db_manager, _llm_manager, _response_cache
 
     print("Initializing RAG Chatbot Components...")
-    print("Processing JSON/JSONL files with ChromaDB vector storage")
 
     try:
         # Initialize core components
         print("Loading embedding model and LLM...")
         _embedding_manager = EmbeddingManager()
         _llm_manager = LLMManager()
+        # Collection uses tuned HNSW settings (cosine space, M=32, construction_ef=200,
+        # search_ef=40) from config.CHROMA_HNSW_METADATA; they take effect on (re)ingestion
         _vector_db_manager = VectorDBManager()
 
         # Validate component initialization
@@ -49,45 +74,192 @@ def _init_rag_chatbot_components():
             print(f"   Embedding Manager: {'✅' if model_valid else '❌'}")
             print(f"   Vector Database: {'✅' if vector_valid else '❌'}")
             print(f"   LLM Manager: {'✅' if llm_valid else '❌'}")
-            return
+            _reset_rag_components()
+            return False
 
-        # Load and process documents
-        print("Loading documents from data folder...")
-        documents = load_documents_from_folder(DATA_FOLDER, single_file_path=_SINGLE_FILE_TO_DEBUG)
+        # Semantic response cache reuses the already-loaded embedding model
+        if SEMANTIC_CACHE['enabled']:
+            try:
+                _response_cache = SemanticResponseCache(_embedding_manager.get_dimension())
+                # Drop cached answers generated from a different knowledge base
+                fingerprint = _vector_db_manager.load_corpus_fingerprint()
+                if fingerprint is not None:
+                    _response_cache.set_corpus_fingerprint(fingerprint)
+            except Exception as e:
+                print(f"WARNING: Semantic response cache disabled: {e}")
+                _response_cache = None
 
-        if not documents:
-            print("WARNING: No documents found. Please add JSON/JSONL files to the data folder.")
-            return
+        if _vector_db_manager.collection.count() == 0:
+            print("WARNING: ChromaDB collection is empty. Run 'python main.py ingest' to load the documents.")
+        print("RAG components ready.")
+        return True
 
-        print(f"Loaded {len(documents)} documents:")
-        for doc in documents:
-            print(f"   - {os.path.basename(doc['source'])}")
+    except Exception as e:
+        print(f"ERROR during initialization: {e}")
+        _reset_rag_components()
+        return False
 
-        # Create text chunks for vector storage
-        print("Creating text chunks...")
-        chunks = chunk_text(documents)
-        if not chunks:
-            print("ERROR: No text chunks created from documents.")
-            return
 
-        # Generate embeddings and store in ChromaDB
-        print("Generating embeddings and storing in ChromaDB...")
-        embeddings = _embedding_manager.create_embeddings(chunks)
-        if embeddings is None:
-            print("ERROR: Failed to create embeddings.")
-            return
+def _reset_rag_components():
+    """Drop partially loaded components so queries report the system as not initialized."""
+    global _embedding_manager, _vector_db_manager, _llm_manager, _response_cache
+    _embedding_manager = None
+    _vector_db_manager = None
+    _llm_manager = None
+    _response_cache = None
 
-        _vector_db_manager.add_documents(embeddings, chunks, force_reingestion=_FORCE_CHROMA_REINGESTION)
-        print(f"RAG system initialized successfully with {len(chunks)} chunks!")
 
-    except Exception as e:
-        print(f"ERROR during initialization: {e}")
-        _embedding_manager = None
-        _vector_db_manager = None
-        _llm_manager = None
+def ingest_documents(force_reingestion: bool = False) -> bool:
+    """
+    Load, chunk and embed the documents in the data folder and store them in ChromaDB.
+    Meant for startup or the 'ingest' command, never a request path: it recreates the
+    collection, so other running processes must be restarted afterwards.
+
+    Args:
+        force_reingestion: Rebuild the collection even if it already holds this corpus
+
+    Returns:
+        True if the collection holds the current documents
+    """
+    if not ensure_rag_components():
+        return False
+
+    print("Loading documents from data folder...")
+    documents = load_documents_from_folder(DATA_FOLDER, single_file_path=_SINGLE_FILE_TO_DEBUG)
+
+    if not documents:
+        print("WARNING: No documents found. Please add JSON/JSONL files to the data folder.")
+        return False
+
+    print(f"Loaded {len(documents)} documents:")
+    for doc in documents:
+        print(f"   - {os.path.basename(doc['source'])}")
+
+    # Create text chunks for vector storage
+    print("Creating text chunks...")
+    chunks = chunk_text(documents)
+    if not chunks:
+        print("ERROR: No text chunks created from documents.")
+        return False
+
+    # Skip the expensive embedding pass when the collection already holds this corpus
+    fingerprint = corpus_fingerprint(chunks)
+    if (not force_reingestion and _vector_db_manager.collection.count() > 0
+            and _vector_db_manager.load_corpus_fingerprint() == fingerprint):
+        print(f"ChromaDB collection is up to date ({len(chunks)} chunks), skipping ingestion.")
+        return True
+
+    # Generate embeddings and store in ChromaDB
+    print("Generating embeddings and storing in ChromaDB...")
+    embeddings = _embedding_manager.create_embeddings(chunks)
+    if embeddings is None:
+        print("ERROR: Failed to create embeddings.")
+        return False
+
+    if not _vector_db_manager.add_documents(embeddings, chunks, force_reingestion=True):
+        return False
+    _vector_db_manager.store_corpus_fingerprint(fingerprint)
+
+    # Cached answers are only valid for the knowledge base they were generated from
+    _exact_cache.invalidate()
+    if _response_cache is not None:
+        _response_cache.set_corpus_fingerprint(fingerprint)
+    print(f"Ingested {len(chunks)} chunks into ChromaDB.")
+    return True
+
+
+def ensure_rag_components() -> bool:
+    """
+    Load the RAG components on first use, once per process.
+    Avoids loading models at import time in processes that never serve queries
+    (such as the Flask reloader parent) and is safe to call from request threads.
+    A failed load is retried after a backoff that doubles up to _INIT_BACKOFF_MAX.
+
+    Returns:
+        True if the components are loaded
+    """
+    global _init_succeeded, _next_init_attempt, _init_backoff
+    if _init_succeeded:
+        return True
+    if time.monotonic() < _next_init_attempt:
+        return False
+    with _init_lock:
+        if _init_succeeded:
+            return True
+        if time.monotonic() < _next_init_attempt:
+            return False
+        _init_succeeded = _load_rag_components()
+        if not _init_succeeded:
+            _init_backoff = min(_init_backoff * 2 or _INIT_BACKOFF_START, _INIT_BACKOFF_MAX)
+            _next_init_attempt = time.monotonic() + _init_backoff
+            print(f"Retrying RAG initialization in {_init_backoff:.0f}s.")
+        return _init_succeeded
+
+def _log_cache_tier(tier: str):
+    """Record which response tier served a query and print the running hit counters."""
+    _cache_stats[tier] += 1
+    total = sum(_cache_stats.values())
+    summary = ", ".join(f"{name}={count}" for name, count in sorted(_cache_stats.items()))
+    print(f"Response tier: {tier} ({summary}, total={total})")
+
+def _components_ready() -> bool:
+    """Initialize components if needed and check that they are ready to answer queries."""
+    return ensure_rag_components() and all([_vector_db_manager, _llm_manager])
+
+def _not_initialized_response() -> str:
+    error_msg = "Chatbot components not initialized. Please restart the system."
+    print(f"ERROR: {error_msg}")
+    return f"I'm sorry, {error_msg.lower()} For assistance, please contact IDC directly at {IDC_CONTACT_EMAIL}."
 
+def _lookup_cached_response(query: str) -> Tuple[Optional[str], str, Optional[np.ndarray]]:
+    """
+    Look up a query in the response cache tiers and the predefined common-query answers.
+    
+    Returns:
+        Tuple of (response or None, exact-match cache key or None if the query must not be
+        cached, query embedding if computed)
+    """
+    # Predefined answers for common queries need no embedding or retrieval
+    canned_response = _llm_manager.try_canned(query)
+    if canned_response is not None:
+        _log_cache_tier("canned")
+        return canned_response, None, None
+
+    # Follow-ups ("tell me more") depend on this conversation's memory, so they always go
+    # to full RAG and are never cached for other conversations
+    if is_context_dependent(query):
+        _log_cache_tier("tier2_rag")
+        return None, None, None
 
-_init_rag_chatbot_components()
+    # Tier 0: identical (normalized) repeats skip query encoding entirely
+    cache_key = normalize_query(query)
+    cached_response = _exact_cache.get(cache_key)
+    if cached_response is not None:
+        _log_cache_tier("tier0_exact")
+        return cached_response, cache_key, None
+
+    # Tier 1: paraphrased questions are served from the semantic cache
+    query_embedding = None
+    if _response_cache is not None:
+        query_embedding = _embedding_manager.encode_query(query)
+        cached_response = _response_cache.lookup(query_embedding)
+        if cached_response is not None:
+            _exact_cache.put(cache_key, cached_response)
+            _log_cache_tier("tier1_semantic")
+            return cached_response, cache_key, query_embedding
+
+    # Tier 2: full retrieval + generation
+    _log_cache_tier("tier2_rag")
+    return None, cache_key, query_embedding
+
+def _store_response(cache_key: Optional[str], query_embedding: Optional[np.ndarray],
+                    relevant_context: List[str], response: str):
+    """Cache a generated response; only grounded answers, never fallbacks or Gemini failures."""
+    if cache_key is None or not relevant_context or response.endswith((NO_ANSWER_RESPONSE, TECHNICAL_ISSUE_RESPONSE)):
+        return
+    _exact_cache.put(cache_key, response)
+    if _response_cache is not None:
+        _response_cache.add(query_embedding, response)
 
 def ask_idc_chatbot(query: str) -> str:
     """
@@ -100,18 +272,21 @@ def ask_idc_chatbot(query: str) -> str:
         str: Generated response from the chatbot
     """
     # Check if components are properly initialized
-    if not all([_vector_db_manager, _llm_manager]):
-        error_msg = "Chatbot components not initialized. Please restart the system."
-        print(f"ERROR: {error_msg}")
-        return f"I'm sorry, {error_msg.lower()} For assistance, please contact IDC directly at {IDC_CONTACT_EMAIL}."
+    if not _components_ready():
+        return _not_initialized_response()
 
     try:
+        cached_response, cache_key, query_embedding = _lookup_cached_response(query)
+        if cached_response is not None:
+            return cached_response
+
         # Retrieve relevant context from vector database
         print(f"Processing query: {query}")
-        relevant_context = _vector_db_manager.retrieve_context(query, n_results=5)
+        relevant_context = _vector_db_manager.retrieve_context(query, n_results=5, query_embedding=query_embedding)
         
         # Generate response using LLM with retrieved context
         response = _llm_manager.generate_response(query, relevant_context)
+        _store_response(cache_key, query_embedding, relevant_context, response)
         return response
         
     except Exception as e:
@@ -119,12 +294,48 @@ def ask_idc_chatbot(query: str) -> str:
         print(f"ERROR: {error_msg}")
         return f"I encountered a technical issue while processing your question. Please try again or contact IDC directly at {IDC_CONTACT_EMAIL} for assistance."
 
+def ask_idc_chatbot_stream(query: str) -> Iterator[str]:
+    """
+    Streaming variant of ask_idc_chatbot that yields the response as Gemini generates it.
+    Cache hits are yielded as a single chunk.
+    
+    Args:
+        query (str): User's question or query
+        
+    Yields:
+        str: Response text chunks
+    """
+    if not _components_ready():
+        yield _not_initialized_response()
+        return
+
+    try:
+        cached_response, cache_key, query_embedding = _lookup_cached_response(query)
+        if cached_response is not None:
+            yield cached_response
+            return
+
+        print(f"Processing query: {query}")
+        relevant_context = _vector_db_manager.retrieve_context(query, n_results=5, query_embedding=query_embedding)
+
+        response_chunks = []
+        for chunk in _llm_manager.stream_response(query, relevant_context):
+            response_chunks.append(chunk)
+            yield chunk
+
+        _store_response(cache_key, query_embedding, relevant_context, "".join(response_chunks))
+
+    except Exception as e:
+        error_msg = f"Error processing query: {str(e)}"
+        print(f"ERROR: {error_msg}")
+        yield f"I encountered a technical issue while processing your question. Please try again or contact IDC directly at {IDC_CONTACT_EMAIL} for assistance."
+
 def main():
     """
     Console-based interactive chatbot for direct testing and usage.
     Allows users to ask questions in a command-line interface.
     """
-    if not all([_vector_db_manager, _llm_manager]):
+    if not _components_ready():
         print("ERROR: Chatbot components not properly initialized.")
         return
 
@@ -191,22 +402,22 @@ def test_chatbot_queries():
 
 if __name__ == "__main__":
     import sys
-    
-    # Initialize RAG components on startup
-    _init_rag_chatbot_components()
-    
-    # Check command line arguments for different modes
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "test":
+
+    mode = sys.argv[1] if len(sys.argv) > 1 else "console"
+    if mode == "ingest":
+        # Offline (re)ingestion; restart running servers afterwards
+        sys.exit(0 if ingest_documents(force_reingestion=True) else 1)
+    elif mode in ("test", "console"):
+        # Ingest on startup only if the collection is empty or out of date
+        ingest_documents()
+        if mode == "test":
             print("Running chatbot tests...")
             test_chatbot_queries()
-        elif sys.argv[1] == "console":
-            main()
         else:
-            print("Usage: python main.py [test|console]")
-            print("  test    - Run test queries to validate chatbot performance")
-            print("  console - Interactive console mode for chatbot")
-            print("  (no args) - Default console mode")
+            main()
     else:
-        # Default behavior - run interactive console
-        main()
\ No newline at end of file
+        print("Usage: python main.py [ingest|test|console]")
+        print("  ingest  - Rebuild the ChromaDB collection from the data folder")
+        print("  test    - Run test queries to validate chatbot performance")
+        print("  console - Interactive console mode for chatbot")
+        print("  (no args) - Default console mode")
@@ -8,19 +8,39 @@ Specifically designed to extract partner logos and company information from pres
 import os
 import io
 import json
-from typing import List, Dict, Optional, Tuple
+import shlex
+import hashlib
+import itertools
+import tempfile
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterator, Optional, Tuple
 from pathlib import Path
 
 # Core libraries
 from pptx import Presentation
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image, ImageFilter
 import cv2
 import numpy as np
 
 # OCR and configuration
+# Keep each Tesseract instance single-threaded; parallelism comes from the worker pool
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
 import pytesseract
 from config import PPTX_PROCESSING, OCR_SETTINGS
 
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None  # Fall back to the pytesseract subprocess per image
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None  # OCR results are then cached for the current process only
+
 # Import logging configuration
 from logging_config import (
     setup_clean_logging, pptx_logger, log_processing_summary, log_skipped_formats
@@ -30,6 +50,81 @@ from logging_config import (
 setup_clean_logging()
 
 
+# Pool of in-process Tesseract engines, created once per process on first use
+_tesseract_pool = None
+_tesseract_pool_lock = threading.Lock()
+
+
+def parse_tesseract_config(config: str) -> Dict:
+    """
+    Split a Tesseract command-line config into the settings tesserocr takes as arguments.
+    
+    Args:
+        config: Options as passed to the tesseract CLI / pytesseract (e.g. "--oem 3 --psm 6 -l eng")
+        
+    Returns:
+        Dictionary with 'lang', 'psm', 'oem', 'tessdata_dir', 'variables' and 'unsupported' options
+    """
+    parsed = {'lang': 'eng', 'psm': None, 'oem': None, 'tessdata_dir': None, 'variables': {}, 'unsupported': []}
+    tokens = shlex.split(config)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        value = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token == '-l' and value is not None:
+            parsed['lang'] = value
+        elif token == '--psm' and value is not None:
+            parsed['psm'] = int(value)
+        elif token == '--oem' and value is not None:
+            parsed['oem'] = int(value)
+        elif token == '--tessdata-dir' and value is not None:
+            parsed['tessdata_dir'] = value
+        elif token == '-c' and value is not None and '=' in value:
+            key, var_value = value.split('=', 1)
+            parsed['variables'][key] = var_value
+        else:
+            parsed['unsupported'].append(token)
+            i += 1
+            continue
+        i += 2
+    return parsed
+
+
+def _get_tesseract_pool() -> "queue.Queue":
+    """
+    Return the shared pool of tesserocr.PyTessBaseAPI instances.
+    Each instance loads the language data once and is checked out by one OCR thread at a time.
+    """
+    global _tesseract_pool
+    if _tesseract_pool is None:
+        with _tesseract_pool_lock:
+            if _tesseract_pool is None:
+                # Same options as the pytesseract path, so both backends read the config identically
+                config = parse_tesseract_config(OCR_SETTINGS['tesseract_config'])
+                if config['unsupported']:
+                    pptx_logger.warning(
+                        f"tesserocr ignores unsupported tesseract_config options: {' '.join(config['unsupported'])}"
+                    )
+                init_args = {
+                    'lang': config['lang'],
+                    'psm': config['psm'] if config['psm'] is not None else tesserocr.PSM.AUTO,
+                    'oem': config['oem'] if config['oem'] is not None else tesserocr.OEM.DEFAULT,
+                    'variables': config['variables']  # -c key=value, set at init like the CLI does
+                }
+                if config['tessdata_dir']:
+                    init_args['path'] = config['tessdata_dir']
+                pool = queue.Queue()
+                for _ in range(OCR_SETTINGS['ocr_workers']):
+                    pool.put(tesserocr.PyTessBaseAPI(**init_args))
+                _tesseract_pool = pool
+    return _tesseract_pool
+
+
+def image_content_hash(image_data: bytes) -> str:
+    """Content hash of an image blob, identical for the same logo on any slide or deck."""
+    return hashlib.blake2b(image_data, digest_size=16).hexdigest()
+
+
 class PPTXImageExtractor:
     """
     Extracts images from PowerPoint presentations and prepares them for OCR processing.
@@ -40,6 +135,56 @@ class PPTXImageExtractor:
         self.ocr_config = OCR_SETTINGS
         print("PPTX Image Extractor initialized")
     
+    @staticmethod
+    def new_stats() -> Dict:
+        """Empty extraction stats for one presentation."""
+        return {'total_found': 0, 'skipped_formats': [], 'skipped_low_info': 0, 'extracted': 0}
+    
+    def iter_images_from_pptx(self, pptx_path: str, stats: Dict) -> Iterator[Dict]:
+        """
+        Yield images from a PowerPoint presentation in slide order.
+        Slides are decoded in parallel on a thread pool (image decoding releases the GIL)
+        with a bounded lookahead, so memory does not grow with deck size.
+        
+        Args:
+            pptx_path: Path to the PPTX file
+            stats: Processing stats dictionary (see new_stats), updated as slides are read
+            
+        Yields:
+            Extracted image dictionaries
+        """
+        try:
+            presentation = Presentation(pptx_path)
+        except Exception as e:
+            pptx_logger.error(f"Error extracting images from {pptx_path}: {e}")
+            return
+        
+        workers = self.config['extraction_workers']
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for slide_num, slide in enumerate(presentation.slides, 1):
+                pending.append(executor.submit(self._extract_slide_images, slide, slide_num, pptx_path))
+                if len(pending) >= workers * 2:
+                    yield from self._collect_slide(pending.popleft().result(), stats)
+            while pending:
+                yield from self._collect_slide(pending.popleft().result(), stats)
+        
+        # Log clean summary instead of individual messages
+        if stats['skipped_formats']:
+            log_skipped_formats(os.path.basename(pptx_path), 
+                              len(stats['skipped_formats']), 
+                              stats['skipped_formats'])
+    
+    @staticmethod
+    def _collect_slide(slide_result: Tuple[List[Dict], Dict], stats: Dict) -> List[Dict]:
+        """Add one slide's extraction stats to the running totals and return its images."""
+        slide_images, slide_stats = slide_result
+        stats['total_found'] += slide_stats['total_found']
+        stats['skipped_formats'].extend(slide_stats['skipped_formats'])
+        stats['skipped_low_info'] += slide_stats['skipped_low_info']
+        stats['extracted'] += len(slide_images)
+        return slide_images
+    
     def extract_images_from_pptx(self, pptx_path: str) -> Tuple[List[Dict], Dict]:
         """
         Extract all images from a PowerPoint presentation.
@@ -50,29 +195,12 @@ class PPTXImageExtractor:
         Returns:
             Tuple of (extracted images list, processing stats)
         """
+        stats = self.new_stats()
         try:
-            presentation = Presentation(pptx_path)
-            extracted_images = []
-            stats = {'total_found': 0, 'skipped_formats': [], 'extracted': 0}
-            
-            for slide_num, slide in enumerate(presentation.slides, 1):
-                slide_images, slide_stats = self._extract_slide_images(slide, slide_num, pptx_path)
-                extracted_images.extend(slide_images)
-                stats['total_found'] += slide_stats['total_found']
-                stats['skipped_formats'].extend(slide_stats['skipped_formats'])
-                stats['extracted'] += len(slide_images)
-            
-            # Log clean summary instead of individual messages
-            if stats['skipped_formats']:
-                log_skipped_formats(os.path.basename(pptx_path), 
-                                  len(stats['skipped_formats']), 
-                                  stats['skipped_formats'])
-            
-            return extracted_images, stats
-            
+            return list(self.iter_images_from_pptx(pptx_path, stats)), stats
         except Exception as e:
             pptx_logger.error(f"Error extracting images from {pptx_path}: {e}")
-            return [], {'total_found': 0, 'skipped_formats': [], 'extracted': 0}
+            return [], self.new_stats()
     
     def _extract_slide_images(self, slide, slide_num: int, source_file: str) -> Tuple[List[Dict], Dict]:
         """
@@ -87,7 +215,7 @@ class PPTXImageExtractor:
             Tuple of (image data list, processing stats)
         """
         slide_images = []
-        stats = {'total_found': 0, 'skipped_formats': []}
+        stats = {'total_found': 0, 'skipped_formats': [], 'skipped_low_info': 0}
         
         for shape_idx, shape in enumerate(slide.shapes):
             if hasattr(shape, 'image') and shape.image:
@@ -110,16 +238,17 @@ class PPTXImageExtractor:
                         stats['skipped_formats'].append(image_format)
                         continue
                     
-                    # Create PIL Image
-                    pil_image = Image.open(io.BytesIO(image_data))
+                    # Decode once, straight to the grayscale array used for OCR
+                    gray_image = self._decode_grayscale(image_data)
                     
-                    # Convert palette images with transparency to RGBA to avoid warnings
-                    if pil_image.mode == 'P' and 'transparency' in pil_image.info:
-                        pil_image = pil_image.convert('RGBA')
+                    # Skip images that cannot contain readable text before any OCR work
+                    if self._is_low_information(gray_image):
+                        stats['skipped_low_info'] += 1
+                        continue
                     
                     # Resize if too large
                     if self.config['max_image_size']:
-                        pil_image = self._resize_image(pil_image, self.config['max_image_size'])
+                        gray_image = self._resize_image(gray_image, self.config['max_image_size'])
                     
                     # Create metadata
                     metadata = {
@@ -127,14 +256,14 @@ class PPTXImageExtractor:
                         'slide_number': slide_num,
                         'shape_index': shape_idx,
                         'image_format': image_format,
-                        'image_size': pil_image.size,
+                        'image_size': (gray_image.shape[1], gray_image.shape[0]),
                         'extraction_method': 'pptx_shape'
                     }
                     
                     slide_images.append({
-                        'image': pil_image,
+                        'image_np': gray_image,
                         'metadata': metadata,
-                        'raw_data': image_data
+                        'content_hash': image_content_hash(image_data)  # Raw blob is not retained
                     })
                     
                 except Exception as e:
@@ -144,48 +273,98 @@ class PPTXImageExtractor:
         
         return slide_images, stats
     
-    def _resize_image(self, image: Image.Image, max_size: Tuple[int, int]) -> Image.Image:
+    def _decode_grayscale(self, image_data: bytes) -> np.ndarray:
+        """
+        Decode an image blob directly into a grayscale uint8 array.
+        
+        Args:
+            image_data: Raw image bytes from the presentation
+            
+        Returns:
+            Grayscale image array of shape (height, width)
+        """
+        gray = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            # OpenCV builds without a decoder for the format (e.g. GIF) fall back to Pillow
+            pil_image = Image.open(io.BytesIO(image_data))
+            max_size = self.config['max_image_size']
+            if max_size and (pil_image.width > max_size[0] or pil_image.height > max_size[1]):
+                # Box-reduce by an integer factor first, then a cheap bilinear pass;
+                # OCR thresholding gains nothing from a Lanczos kernel
+                pil_image.thumbnail(max_size, Image.Resampling.BILINEAR, reducing_gap=3.0)
+            gray = np.asarray(pil_image.convert('L'), dtype=np.uint8)
+        return gray
+    
+    def _is_low_information(self, gray_image: np.ndarray) -> bool:
+        """
+        Check whether an image is too small or too uniform to contain text.
+        
+        Args:
+            gray_image: Grayscale image array
+            
+        Returns:
+            True for spacers, tiny icons and solid-color or flat-gradient images
+        """
+        height, width = gray_image.shape[:2]
+        if width * height < self.config['min_image_area']:
+            return True
+        
+        return float(gray_image.std()) < self.config['min_pixel_std']
+    
+    def _resize_image(self, image: np.ndarray, max_size: Tuple[int, int]) -> np.ndarray:
         """
-        Resize image while maintaining aspect ratio.
+        Shrink image to fit max_size while maintaining aspect ratio.
         
         Args:
-            image: PIL Image object
+            image: Image array
             max_size: Maximum (width, height)
             
         Returns:
-            Resized PIL Image
+            Resized image array (the input itself if it already fits)
+        """
+        height, width = image.shape[:2]
+        scale = min(max_size[0] / width, max_size[1] / height)
+        if scale >= 1:
+            return image
+        
+        new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        return cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+    
+    @staticmethod
+    def _contrast_lut(gray: np.ndarray, factor: float) -> np.ndarray:
+        """
+        Build a contrast lookup table around the image mean (same mapping as ImageEnhance.Contrast).
+        
+        Args:
+            gray: Grayscale image array
+            factor: Contrast factor, 1.0 leaves the image unchanged
+            
+        Returns:
+            256-entry uint8 lookup table
         """
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        return image
+        mean = int(gray.mean() + 0.5)
+        levels = np.arange(256, dtype=np.float32)
+        return np.clip(mean + factor * (levels - mean), 0, 255).astype(np.uint8)
     
-    def preprocess_image_for_ocr(self, pil_image: Image.Image) -> Image.Image:
+    def preprocess_image_for_ocr(self, gray_image: np.ndarray) -> np.ndarray:
         """
         Preprocess image to improve OCR accuracy.
         
         Args:
-            pil_image: Input PIL Image
+            gray_image: Grayscale image array
             
         Returns:
-            Preprocessed PIL Image
+            Preprocessed grayscale image array
         """
         if not self.ocr_config['preprocess_images']:
-            return pil_image
+            return gray_image
         
         try:
-            # Convert to RGB if needed
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
+            gray = gray_image
             
-            # Enhance contrast
+            # Enhance contrast with a lookup table
             if self.ocr_config['enhance_contrast']:
-                enhancer = ImageEnhance.Contrast(pil_image)
-                pil_image = enhancer.enhance(1.5)
-            
-            # Convert to OpenCV format for advanced preprocessing
-            opencv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
+                gray = cv2.LUT(gray, self._contrast_lut(gray, 1.5))
             
             # Remove noise
             if self.ocr_config['remove_noise']:
@@ -196,70 +375,195 @@ class PPTXImageExtractor:
                 gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
             )
             
-            # Convert back to PIL
-            return Image.fromarray(processed)
+            return processed
             
         except Exception as e:
             # Suppress common format errors
             if "cannot find loader" not in str(e).lower():
                 print(f"Warning: Image preprocessing failed, using original image")
-            return pil_image
+            return gray_image
 
 
 class PPTXOCRProcessor:
     """
-    Performs OCR on extracted images using pytesseract.
+    Performs OCR on extracted images using tesserocr (falls back to pytesseract).
     """
     
     def __init__(self):
         self.config = OCR_SETTINGS
+        self.method = 'tesserocr' if tesserocr is not None else 'pytesseract'
+        self.cache = self._open_cache()
+        # Config or backend changes must not reuse results produced under other settings
+        self._config_key = hashlib.blake2b(
+            f"{self.method}|{self.config['tesseract_config']}|{self.config['min_confidence']}|"
+            f"{self.config['preprocess_images']}|{self.config['enhance_contrast']}|"
+            f"{self.config['remove_noise']}".encode('utf-8'),
+            digest_size=8
+        ).hexdigest()
         print("PPTX OCR Processor initialized")
     
-    def extract_text_from_image(self, pil_image: Image.Image, metadata: Dict) -> Dict:
+    def _open_cache(self):
+        """Open the persistent OCR result cache, or an in-process dict without diskcache."""
+        if diskcache is not None:
+            try:
+                return diskcache.Cache(self.config['cache_dir'])
+            except Exception as e:
+                print(f"Could not open OCR cache, using in-memory cache: {e}")
+        return {}
+    
+    def cache_key(self, content_hash: str) -> str:
+        """Cache key combining the image content hash with the OCR settings."""
+        return f"{content_hash}:{self._config_key}"
+    
+    def get_cached(self, content_hash: str, metadata: Dict) -> Optional[Dict]:
         """
-        Extract text from an image using OCR.
+        Return a cached OCR result for an image, attached to this image's metadata.
         
         Args:
-            pil_image: PIL Image object
+            content_hash: Hash of the raw image blob
             metadata: Image metadata
             
         Returns:
-            Dictionary with extracted text and confidence
+            OCR result dictionary, or None on a miss
         """
-        try:
-            # Get OCR configuration
-            custom_config = self.config['tesseract_config']
+        cached = self.cache.get(self.cache_key(content_hash))
+        if cached is None:
+            return None
+        return {**cached, 'metadata': metadata}
+    
+    def store_cached(self, content_hash: str, ocr_result: Dict):
+        """Cache a successful OCR result (errors are retried on the next run)."""
+        if 'error' in ocr_result:
+            return
+        self.cache[self.cache_key(content_hash)] = {
+            'extracted_text': ocr_result['extracted_text'],
+            'confidence': ocr_result['confidence'],
+            'word_count': ocr_result['word_count'],
+            'method': ocr_result['method']
+        }
+    
+    def _ocr_words(self, gray_image: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Run OCR and return (word, confidence) pairs.
+        
+        Args:
+            gray_image: Grayscale image array
             
-            # Extract text with confidence data
-            ocr_data = pytesseract.image_to_data(
-                pil_image, 
-                config=custom_config, 
-                output_type=pytesseract.Output.DICT
-            )
+        Returns:
+            List of (word, confidence) tuples in reading order
+        """
+        if tesserocr is not None:
+            pool = _get_tesseract_pool()
+            api = pool.get()
+            try:
+                # Hand Tesseract the raw 8-bit buffer, no PIL wrapper needed
+                gray_image = np.ascontiguousarray(gray_image)
+                height, width = gray_image.shape
+                api.SetImageBytes(gray_image.tobytes(), width, height, 1, width)
+                return api.MapWordConfidences()
+            finally:
+                pool.put(api)
+        
+        ocr_data = pytesseract.image_to_data(
+            gray_image, 
+            config=self.config['tesseract_config'], 
+            output_type=pytesseract.Output.DICT
+        )
+        return [(text, float(conf)) for text, conf in zip(ocr_data['text'], ocr_data['conf'])]
+    
+    def _build_result(self, ocr_words: List[Tuple[str, float]], metadata: Dict) -> Dict:
+        """
+        Filter OCR words by confidence and combine them into a result dictionary.
+        
+        Args:
+            ocr_words: (word, confidence) pairs for one image
+            metadata: Image metadata
             
-            # Filter by confidence
-            extracted_text = []
-            confidences = []
+        Returns:
+            Dictionary with extracted text and confidence
+        """
+        extracted_text = []
+        confidences = []
+        
+        for text, conf in ocr_words:
+            text = text.strip()
+            
+            if text and conf >= self.config['min_confidence']:
+                extracted_text.append(text)
+                confidences.append(conf)
+        
+        # Combine text
+        full_text = ' '.join(extracted_text)
+        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        
+        return {
+            'extracted_text': full_text,
+            'confidence': avg_confidence,
+            'word_count': len(extracted_text),
+            'method': self.method,
+            'metadata': metadata
+        }
+    
+    def use_batch_mode(self, image_count: int) -> bool:
+        """Batch file-list OCR only pays off for the subprocess-based pytesseract backend."""
+        return tesserocr is None and image_count >= self.config['batch_min_images']
+    
+    def extract_text_batch(self, images: List[np.ndarray], metadatas: List[Dict]) -> Optional[List[Dict]]:
+        """
+        OCR many images with a single Tesseract run using its file-list input mode.
+        
+        Args:
+            images: Preprocessed grayscale image arrays
+            metadatas: Metadata for each image, in the same order
             
-            for i in range(len(ocr_data['text'])):
-                text = ocr_data['text'][i].strip()
-                conf = int(ocr_data['conf'][i])
+        Returns:
+            One result dictionary per image, or None if the batch run failed
+        """
+        try:
+            with tempfile.TemporaryDirectory(prefix="pptx_ocr_") as tmp_dir:
+                image_paths = []
+                for i, image in enumerate(images):
+                    image_path = os.path.join(tmp_dir, f"image_{i:05d}.png")
+                    cv2.imwrite(image_path, image)
+                    image_paths.append(image_path)
                 
-                if text and conf >= self.config['min_confidence']:
-                    extracted_text.append(text)
-                    confidences.append(conf)
+                # Tesseract treats a .txt input as a list of image paths, one page per image
+                manifest_path = os.path.join(tmp_dir, "images.txt")
+                with open(manifest_path, 'w', encoding='utf-8') as f:
+                    f.write('\n'.join(image_paths) + '\n')
+                
+                ocr_data = pytesseract.image_to_data(
+                    manifest_path,
+                    config=self.config['tesseract_config'],
+                    output_type=pytesseract.Output.DICT
+                )
             
-            # Combine text
-            full_text = ' '.join(extracted_text)
-            avg_confidence = np.mean(confidences) if confidences else 0
+            # Split words back out per input image using the page number column
+            words_per_image = [[] for _ in images]
+            for page_num, text, conf in zip(ocr_data['page_num'], ocr_data['text'], ocr_data['conf']):
+                if 1 <= page_num <= len(words_per_image):
+                    words_per_image[page_num - 1].append((text, float(conf)))
             
-            return {
-                'extracted_text': full_text,
-                'confidence': avg_confidence,
-                'word_count': len(extracted_text),
-                'method': 'pytesseract',
-                'metadata': metadata
-            }
+            return [self._build_result(words, metadata) for words, metadata in zip(words_per_image, metadatas)]
+            
+        except Exception as e:
+            print(f"Batch OCR failed, falling back to per-image OCR: {e}")
+            return None
+    
+    def extract_text_from_image(self, gray_image: np.ndarray, metadata: Dict) -> Dict:
+        """
+        Extract text from an image using OCR.
+        
+        Args:
+            gray_image: Grayscale image array
+            metadata: Image metadata
+            
+        Returns:
+            Dictionary with extracted text and confidence
+        """
+        try:
+            # Extract words with confidence data
+            return self._build_result(self._ocr_words(gray_image), metadata)
             
         except Exception as e:
             print(f"Error during OCR processing: {e}")
@@ -267,7 +571,7 @@ class PPTXOCRProcessor:
                 'extracted_text': '',
                 'confidence': 0,
                 'word_count': 0,
-                'method': 'pytesseract',
+                'method': self.method,
                 'error': str(e),
                 'metadata': metadata
             }
@@ -283,6 +587,75 @@ class PPTXProcessor:
         self.ocr_processor = PPTXOCRProcessor()
         print("PPTX Processor initialized successfully")
     
+    def _process_one(self, image_data: Dict) -> Dict:
+        """
+        Cache lookup, preprocessing and OCR for one image as a single worker task,
+        so the preprocessed array goes straight to Tesseract on the same thread.
+        """
+        content_hash = image_data['content_hash']
+        cached_result = self.ocr_processor.get_cached(content_hash, image_data['metadata'])
+        if cached_result is not None:
+            return cached_result
+        
+        ocr_result = self.ocr_processor.extract_text_from_image(
+            self.image_extractor.preprocess_image_for_ocr(image_data['image_np']), image_data['metadata']
+        )
+        self.ocr_processor.store_cached(content_hash, ocr_result)
+        return ocr_result
+    
+    def _ocr_images_batch(self, extracted_images: List[Dict], executor: ThreadPoolExecutor) -> Optional[List[Dict]]:
+        """
+        OCR uncached images with one file-list Tesseract run (pytesseract backend).
+        
+        Returns:
+            One OCR result per image, or None if the batch run failed
+        """
+        # Serve repeated images (logos) from the OCR cache
+        all_results = [
+            self.ocr_processor.get_cached(image_data['content_hash'], image_data['metadata'])
+            for image_data in extracted_images
+        ]
+        pending = [image_data for image_data, result in zip(extracted_images, all_results) if result is None]
+        if not pending:
+            return all_results
+        
+        preprocessed_images = list(executor.map(
+            lambda image_data: self.image_extractor.preprocess_image_for_ocr(image_data['image_np']),
+            pending
+        ))
+        new_results = self.ocr_processor.extract_text_batch(
+            preprocessed_images, [image_data['metadata'] for image_data in pending]
+        )
+        if new_results is None:
+            return None
+        
+        new_results = iter(new_results)
+        for i, image_data in enumerate(extracted_images):
+            if all_results[i] is None:
+                all_results[i] = next(new_results)
+                self.ocr_processor.store_cached(image_data['content_hash'], all_results[i])
+        
+        return all_results
+    
+    def _ocr_images(self, extracted_images: List[Dict], executor: ThreadPoolExecutor) -> List[Dict]:
+        """
+        OCR extracted images, reusing cached results for repeated images.
+        
+        Args:
+            extracted_images: Image dictionaries from the image extractor
+            executor: Thread pool shared by all windows of the presentation
+            
+        Returns:
+            One OCR result per image, in the same order
+        """
+        if self.ocr_processor.use_batch_mode(len(extracted_images)):
+            batch_results = self._ocr_images_batch(extracted_images, executor)
+            if batch_results is not None:
+                return batch_results
+        
+        # Tesseract and OpenCV release the GIL, so threads run in parallel
+        return list(executor.map(self._process_one, extracted_images))
+    
     def process_pptx_file(self, pptx_path: str) -> Dict:
         """
         Process a complete PPTX file and extract all text content.
@@ -298,24 +671,25 @@ class PPTXProcessor:
             presentation = Presentation(pptx_path)
             slide_count = len(presentation.slides)
             
-            # Extract images
-            extracted_images, extraction_stats = self.image_extractor.extract_images_from_pptx(pptx_path)
-            
-            # Process each image with OCR
+            # Stream images through OCR a window at a time; each window's pixel
+            # arrays are released before the next slides are decoded
+            extraction_stats = self.image_extractor.new_stats()
+            images = self.image_extractor.iter_images_from_pptx(pptx_path, extraction_stats)
+            window_size = self.ocr_processor.config['stream_window']
+            images_processed = 0
             ocr_results = []
-            for image_data in extracted_images:
-                # Preprocess image
-                preprocessed_image = self.image_extractor.preprocess_image_for_ocr(
-                    image_data['image']
-                )
-                
-                # Extract text
-                ocr_result = self.ocr_processor.extract_text_from_image(
-                    preprocessed_image, image_data['metadata']
-                )
-                
-                if ocr_result['extracted_text']:  # Only include non-empty results
-                    ocr_results.append(ocr_result)
+            
+            with ThreadPoolExecutor(max_workers=self.ocr_processor.config['ocr_workers']) as executor:
+                while True:
+                    window = list(itertools.islice(images, window_size))
+                    if not window:
+                        break
+                    images_processed += len(window)
+                    
+                    # Only include non-empty results, in slide order
+                    ocr_results.extend(
+                        result for result in self._ocr_images(window, executor) if result['extracted_text']
+                    )
             
             # Log clean processing summary
             log_processing_summary(
@@ -329,7 +703,7 @@ class PPTXProcessor:
             result = {
                 'source_file': pptx_path,
                 'slide_count': slide_count,
-                'images_processed': len(extracted_images),
+                'images_processed': images_processed,
                 'successful_ocr': len(ocr_results),
                 'ocr_results': ocr_results,
                 'processing_method': 'pptx_ocr'
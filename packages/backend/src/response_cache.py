@@ -0,0 +1,340 @@
+"""
+Response Cache Module
+
+Caches chatbot responses so repeated or paraphrased questions are answered
+without running vector retrieval or a Gemini round-trip.
+"""
+
+import os
+import re
+import json
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # No advisory file locks (Windows): assume a single process owns the cache files
+
+from config import SEMANTIC_CACHE
+from text_matching import PhraseMatcher
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_TRAILING_PUNCT_RE = re.compile(r'[\s?!.,;:]+$')
+
+# Phrases that point back at earlier turns; the answer depends on conversation memory,
+# so such queries are never served from or stored in the shared caches. Bare pronouns are
+# left out on purpose: "it"/"its"/"their" also appear in first-turn questions ("What IT
+# services does IDC offer?", "IDC and its services")
+FOLLOW_UP_PHRASES = [
+    "tell me more", "more about that", "more on that", "elaborate", "explain further", "go on",
+    "what about", "how about", "the above", "you said", "you mentioned", "your previous answer",
+    "your last answer", "same question", "that one"
+]
+_FOLLOW_UP_MATCHER = PhraseMatcher({phrase: phrase for phrase in FOLLOW_UP_PHRASES}, whole_words=True)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for exact-match caching.
+    Lowercases, collapses whitespace and strips trailing punctuation so that
+    "How do I contact IDC?" and "how do i  contact idc" share a key.
+    """
+    normalized = _WHITESPACE_RE.sub(' ', query.lower()).strip()
+    return _TRAILING_PUNCT_RE.sub('', normalized)
+
+
+def is_context_dependent(query: str) -> bool:
+    """True if a query refers back to the conversation (e.g. "tell me more about it")."""
+    return bool(_FOLLOW_UP_MATCHER.find(query))
+
+
+def corpus_fingerprint(chunks: List[Dict[str, Any]]) -> str:
+    """
+    Hash of the ingested chunk ids and contents.
+    Cached answers are only valid for the knowledge base they were generated from.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        digest.update(chunk["id"].encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(chunk["text"].encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ExactResponseCache:
+    """
+    LRU cache of responses keyed on the normalized query text.
+    Checked before the semantic cache so identical repeats skip query encoding.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries if max_entries is not None else SEMANTIC_CACHE['exact_max_entries']
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a normalized query key, or None on a miss."""
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+            return response
+
+    def put(self, key: str, response: str):
+        """Store a response, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str = None):
+        """Drop a single key, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class SemanticResponseCache:
+    """
+    Semantic cache keyed on normalized query embeddings.
+    Vectors live in a FAISS inner-product index (inner product == cosine for
+    normalized vectors) with a parallel list of cached responses.
+
+    The index is persisted with faiss.write_index and responses go to an
+    append-only JSONL log, both flushed every few adds and at exit, so the
+    cache survives restarts without re-embedding anything. Entries are tied to
+    a corpus fingerprint and dropped when the knowledge base changes.
+
+    With several worker processes sharing a cache directory, only the process
+    holding the directory's owner lock writes the files; the others load them
+    at startup and keep their own additions in memory.
+    """
+
+    def __init__(self, dimension: int, threshold: float = None, max_entries: int = None,
+                 cache_dir: str = None, flush_every: int = None):
+        """
+        Initialize the cache and load any persisted entries.
+
+        Args:
+            dimension: Embedding dimension of the query encoder
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of cached responses before LRU eviction
+            cache_dir: Directory used to persist the index and responses
+            flush_every: Number of adds between flushes to disk
+        """
+        self.dimension = dimension
+        self.threshold = threshold if threshold is not None else SEMANTIC_CACHE['similarity_threshold']
+        self.max_entries = max_entries if max_entries is not None else SEMANTIC_CACHE['max_entries']
+        self.cache_dir = cache_dir or SEMANTIC_CACHE['cache_dir']
+        self.flush_every = flush_every if flush_every is not None else SEMANTIC_CACHE['flush_every']
+        self.index_path = os.path.join(self.cache_dir, "index.faiss")
+        self.responses_path = os.path.join(self.cache_dir, "responses.jsonl")
+        self.fingerprint_path = os.path.join(self.cache_dir, "corpus_fingerprint")
+        self.corpus_fingerprint: Optional[str] = None  # Knowledge base the cached answers came from
+
+        self.index = faiss.IndexFlatIP(dimension)
+        self.responses: List[str] = []
+        self._last_used: List[int] = []  # Logical clock per entry, used for LRU eviction
+        self._clock = 0
+        self._persisted_count = 0  # Responses already written to the log
+        self._pending_adds = 0
+        self._needs_rewrite = False  # Set by eviction, which invalidates the append-only log
+        self._lock = threading.Lock()
+        self._owner_lock_file = None
+        self.is_owner = self._acquire_owner_lock()
+
+        self._load()
+        if self.is_owner:
+            atexit.register(self.flush)
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def lookup(self, query_embedding: np.ndarray) -> Optional[str]:
+        """
+        Return the cached response for the closest stored query if it is similar enough.
+
+        Args:
+            query_embedding: Normalized query embedding of shape (dimension,) or (1, dimension)
+
+        Returns:
+            Cached response string, or None on a miss
+        """
+        with self._lock:
+            if self.index.ntotal == 0:
+                return None
+
+            scores, indices = self.index.search(self._as_matrix(query_embedding), 1)
+            best_idx = int(indices[0][0])
+            if best_idx < 0 or scores[0][0] < self.threshold:
+                return None
+
+            self._touch(best_idx)
+            return self.responses[best_idx]
+
+    def add(self, query_embedding: np.ndarray, response: str):
+        """
+        Store a response for a query embedding, evicting the least recently used entry if full.
+
+        Args:
+            query_embedding: Normalized query embedding
+            response: Response text to cache
+        """
+        with self._lock:
+            if self.index.ntotal >= self.max_entries:
+                self._evict_lru()
+
+            self.index.add(self._as_matrix(query_embedding))
+            self.responses.append(response)
+            self._last_used.append(0)
+            self._touch(len(self.responses) - 1)
+
+            self._pending_adds += 1
+            if self._pending_adds >= self.flush_every:
+                self._flush_locked()
+
+    def set_corpus_fingerprint(self, fingerprint: str):
+        """
+        Bind the cache to the current knowledge base, clearing it if the entries came from another one.
+
+        Args:
+            fingerprint: Fingerprint of the ingested chunks (see corpus_fingerprint)
+        """
+        with self._lock:
+            if fingerprint == self.corpus_fingerprint:
+                return
+
+            if self.index.ntotal:
+                print(f"Knowledge base changed, clearing {self.index.ntotal} cached responses.")
+            self.index.reset()
+            self.responses = []
+            self._last_used = []
+            self._clock = 0
+            self._pending_adds = 0
+            self._needs_rewrite = True
+            self.corpus_fingerprint = fingerprint
+            self._flush_locked()
+
+    def flush(self):
+        """Write unsaved entries to the cache directory."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Persist the response log and index; the caller must hold the lock."""
+        if not self.is_owner or (self._pending_adds == 0 and not self._needs_rewrite):
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if self._needs_rewrite:
+                # Eviction shifted positions, so compact the log to match the index
+                tmp_path = f"{self.responses_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.writelines(json.dumps(r) + "\n" for r in self.responses)
+                os.replace(tmp_path, self.responses_path)
+
+                tmp_path = f"{self.fingerprint_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self.corpus_fingerprint or "")
+                os.replace(tmp_path, self.fingerprint_path)
+            else:
+                with open(self.responses_path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(r) + "\n" for r in self.responses[self._persisted_count:])
+
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, self.index_path)
+
+            self._persisted_count = len(self.responses)
+            self._pending_adds = 0
+            self._needs_rewrite = False
+        except Exception as e:
+            print(f"Error saving semantic cache: {e}")
+
+    def _acquire_owner_lock(self) -> bool:
+        """
+        Try to take the cache directory's owner lock without blocking.
+        The lock is held for the life of the process and released by the OS on exit,
+        so exactly one process (e.g. one gunicorn worker) writes the cache files.
+        """
+        if fcntl is None:
+            return True
+
+        lock_file = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            lock_file = open(os.path.join(self.cache_dir, "owner.lock"), 'w')
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            if lock_file is not None:
+                lock_file.close()
+            print("Semantic cache files are owned by another process, keeping new entries in memory.")
+            return False
+
+        self._owner_lock_file = lock_file
+        return True
+
+    def _load(self):
+        """Load the persisted index and response log if both are present and consistent."""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.responses_path)):
+            return
+
+        try:
+            index = faiss.read_index(self.index_path)
+            with open(self.responses_path, 'r', encoding='utf-8') as f:
+                responses = [json.loads(line) for line in f if line.strip()]
+            fingerprint = None
+            if os.path.exists(self.fingerprint_path):
+                with open(self.fingerprint_path, 'r', encoding='utf-8') as f:
+                    fingerprint = f.read().strip() or None
+
+            if index.d != self.dimension or index.ntotal != len(responses):
+                print("Semantic cache files are inconsistent, starting with an empty cache.")
+                return
+
+            if index.ntotal > self.max_entries:
+                # Keep the most recent entries if the configured size shrank
+                index.remove_ids(np.arange(index.ntotal - self.max_entries, dtype=np.int64))
+                responses = responses[-self.max_entries:]
+                self._needs_rewrite = True
+
+            self.index = index
+            self.responses = responses
+            self.corpus_fingerprint = fingerprint
+            self._last_used = list(range(1, len(responses) + 1))
+            self._clock = len(responses)
+            self._persisted_count = len(responses)
+            print(f"Loaded semantic cache with {len(responses)} entries.")
+        except Exception as e:
+            print(f"Error loading semantic cache: {e}")
+
+    def _touch(self, idx: int):
+        self._clock += 1
+        self._last_used[idx] = self._clock
+
+    def _evict_lru(self):
+        """Remove the least recently used entry from the index and response list."""
+        lru_idx = int(np.argmin(self._last_used))
+        # IndexFlat compacts ids on removal, matching the list deletions below
+        self.index.remove_ids(np.array([lru_idx], dtype=np.int64))
+        del self.responses[lru_idx]
+        del self._last_used[lru_idx]
+        self._needs_rewrite = True
+
+    def _as_matrix(self, embedding: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(np.asarray(embedding, dtype=np.float32).reshape(1, self.dimension))
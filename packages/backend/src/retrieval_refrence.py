@@ -1,11 +1,15 @@
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
 from dotenv import load_dotenv
 import os
 import google.generativeai as genai
 import numpy as np
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from text_matching import WORD_RE, word_set
 
 # Load environment variables
 load_dotenv()
@@ -21,22 +25,92 @@ print(f"Loaded API Key: {api_key[:6]}...")
 genai.configure(api_key=api_key)
 model = genai.GenerativeModel("models/gemini-2.5-flash-lite-preview-06-17")
 
-# Load embeddings + Chroma DB
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
-chroma_db = Chroma(persist_directory="./chroma_db", embedding_function=embedding_model)
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+MPNET_ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", "mpnet-onnx-int8")
+
+class QuantizedEmbeddings(Embeddings):
+    # int8 ONNX Runtime mpnet behind the embed_documents/embed_query API of HuggingFaceEmbeddings.
+    # Self-contained so this script does not pull in the backend's config and embedding modules.
+    QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+    def __init__(self, model_name, model_dir, batch_size=32, max_seq_length=384):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        if not os.path.exists(os.path.join(model_dir, self.QUANTIZED_FILE_NAME)):
+            self._export_quantized_model(model_name, model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.ort_model = ORTModelForFeatureExtraction.from_pretrained(model_dir, file_name=self.QUANTIZED_FILE_NAME)
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length
+
+    @staticmethod
+    def _export_quantized_model(model_name, model_dir):
+        # One-time ONNX export with dynamic int8 quantization
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        print(f"Exporting {model_name} to int8 ONNX at {model_dir} (one-time setup)...")
+        quantizer = ORTQuantizer.from_pretrained(ORTModelForFeatureExtraction.from_pretrained(model_name, export=True))
+        quantizer.quantize(save_dir=model_dir,
+                           quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False))
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+
+    def embed_documents(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            features = self.tokenizer(texts[start:start + self.batch_size], padding=True, truncation=True,
+                                      max_length=self.max_seq_length, return_tensors="np")
+            token_embeddings = self.ort_model(**features).last_hidden_state
+            # Mean pooling over non-padding tokens, then L2 normalization (as sentence-transformers does)
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            vectors.extend(normalize_rows(pooled).tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+# Load embeddings + Chroma DB lazily, once per process, on the first question
+@lru_cache(maxsize=1)
+def get_embedder():
+    import torch
+    if not torch.cuda.is_available():
+        # On CPU the int8 model is several times faster than FP32 mpnet
+        try:
+            return QuantizedEmbeddings(EMBEDDING_MODEL_NAME, MPNET_ONNX_DIR)
+        except Exception as e:
+            print(f"int8 ONNX embeddings unavailable, using FP32 model: {e}")
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cuda' if torch.cuda.is_available() else 'cpu'},
+        # Normalized at encode time, so query vectors are ready for a dot-product cosine
+        encode_kwargs={'batch_size': 32, 'normalize_embeddings': True}
+    )
+
+@lru_cache(maxsize=1)
+def get_chroma_db():
+    return Chroma(persist_directory="./chroma_db", embedding_function=get_embedder())
 
 # Utility functions
-def cosine_similarity(vec1, vec2):
-    vec1, vec2 = np.array(vec1), np.array(vec2)
-    return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+_SPLIT_RE = re.compile(r'\s*(?:and|,|\.|\?|;)\s*')
+
+def keyword_overlap(query_words, doc_words):
+    # Jaccard from a single intersection: |A & B| / (|A| + |B| - |A & B|)
+    common = len(query_words & doc_words)
+    union = len(query_words) + len(doc_words) - common
+    return common / union if union else 0.0
 
 def keyword_match_score(query, doc_text):
-    query_words = set(re.findall(r'\w+', query.lower()))
-    doc_words = set(re.findall(r'\w+', doc_text.lower()))
-    return len(query_words & doc_words) / len(query_words | doc_words)
+    return keyword_overlap(word_set(query), word_set(doc_text))
 
 def split_query_into_subquestions(query):
-    return [q.strip() for q in re.split(r'\s*(?:and|,|\.|\?|;)\s*', query) if q.strip()]
+    return [q for q in map(str.strip, _SPLIT_RE.split(query)) if q]
 
 # Predefined fallback answers
 predefined_answers = {
@@ -44,60 +118,92 @@ predefined_answers = {
     "what do you do": "IDC Technologies provides staffing, consulting, and project-based solutions tailored for the IT and engineering sectors.",
 }
 
+def normalize_key(text):
+    # Lowercased words only, so "Who are you?" and "who  are you" share a key
+    return " ".join(WORD_RE.findall(text.lower()))
+
+_PREDEFINED_NORM = {normalize_key(k): v for k, v in predefined_answers.items()}
+
+def answer_subquestion(subq, subq_embed, doc_words_cache):
+    # Query by vector and get back the embeddings Chroma already stores for each hit
+    results = get_chroma_db()._collection.query(
+        query_embeddings=[subq_embed.tolist()],
+        n_results=5,
+        include=["embeddings", "documents", "metadatas", "distances"]
+    )
+    doc_texts = results["documents"][0] if results["documents"] else []
+    doc_metadatas = results["metadatas"][0] if results["metadatas"] else [None] * len(doc_texts)
+    if not doc_texts:
+        return f"For '{subq}': Sorry, I couldn’t find anything."
+
+    # Stored vectors need no re-embedding; normalized rows make cosine a single matmul
+    doc_embeds = normalize_rows(results["embeddings"][0])
+    cos_sims = doc_embeds @ subq_embed
+    subq_words = word_set(subq)
+
+    kw_scores = np.empty(len(doc_texts), dtype=np.float32)
+    for i, (text, metadata) in enumerate(zip(doc_texts, doc_metadatas)):
+        doc_words = doc_words_cache.get(text)
+        if doc_words is None:
+            # Chunks ingested with a token set skip re-tokenizing the text
+            tokens = (metadata or {}).get("tokens")
+            doc_words = frozenset(tokens.split()) if tokens is not None else word_set(text)
+            doc_words_cache[text] = doc_words
+        kw_scores[i] = keyword_overlap(subq_words, doc_words)
+
+    final_scores = (0.7 * cos_sims) + (0.3 * kw_scores)
+    top_docs = [doc_texts[i] for i in np.argsort(-final_scores, kind='stable')[:3]]
+
+    # Compose context block
+    context_block = "\n".join([f"- {text}" for text in top_docs])
+
+    prompt = f"""
+You are AskIDC, a helpful and professional chatbot answering ONLY questions related to IDC Technologies.
+
+Below is some relevant context:
+{context_block}
+
+User sub-question: "{subq}"
+
+Answer professionally, clearly, and only if the context allows.
+"""
+
+    try:
+        response = model.generate_content(prompt)
+        return response.text.strip()
+    except Exception as e:
+        print(f"[Gemini error on sub-question: {subq}] -> {e}")
+        return f"For '{subq}': (Gemini error) Showing top result.\n{top_docs[0]}"
+
 def ask_idc_chatbot(query):
     query = query.strip()
     if not query:
         return "AskIDC: Please type something."
 
-    if query.lower() in predefined_answers:
-        return "AskIDC: " + predefined_answers[query.lower()]
+    predefined = _PREDEFINED_NORM.get(normalize_key(query))
+    if predefined is not None:
+        return "AskIDC: " + predefined
 
     subquestions = split_query_into_subquestions(query)
     if not subquestions:
         subquestions = [query]
 
-    answers = []
+    doc_words_cache = {}  # Token sets per document text, shared across sub-questions
 
-    for subq in subquestions:
-        top_k = chroma_db.similarity_search_with_score(subq, k=5)
-        if not top_k:
-            answers.append(f"For '{subq}': Sorry, I couldn’t find anything.")
-            continue
+    # One batched forward pass for every sub-question
+    subq_embeds = np.asarray(get_embedder().embed_documents(subquestions), dtype=np.float32)
 
-        docs = [doc for doc, _ in top_k]
-        doc_embeds = [embedding_model.embed_query(doc.page_content) for doc in docs]
-        subq_embed = embedding_model.embed_query(subq)
+    # lru_cache does not serialize the first call, so open the Chroma DB here, before the
+    # worker threads, rather than letting each of them build its own client
+    get_chroma_db()
 
-        reranked = []
-        for doc, emb in zip(docs, doc_embeds):
-            cos_sim = cosine_similarity(subq_embed, emb)
-            kw_score = keyword_match_score(subq, doc.page_content)
-            final_score = (0.7 * cos_sim) + (0.3 * kw_score)
-            reranked.append((doc, final_score))
-
-        reranked.sort(key=lambda x: x[1], reverse=True)
-        top_docs = [doc.page_content for doc, score in reranked[:3]]
-
-        # Compose context block
-        context_block = "\n".join([f"- {text}" for text in top_docs])
-
-        prompt = f"""
-You are AskIDC, a helpful and professional chatbot answering ONLY questions related to IDC Technologies.
-
-Below is some relevant context:
-{context_block}
-
-User sub-question: "{subq}"
-
-Answer professionally, clearly, and only if the context allows.
-"""
-
-        try:
-            response = model.generate_content(prompt)
-            answers.append(response.text.strip())
-        except Exception as e:
-            print(f"[Gemini error on sub-question: {subq}] -> {e}")
-            answers.append(f"For '{subq}': (Gemini error) Showing top result.\n{top_docs[0]}")
+    # Retrieval and Gemini calls are independent per sub-question, so run them concurrently;
+    # wall time is the slowest round-trip rather than the sum. map() keeps the answer order.
+    with ThreadPoolExecutor(max_workers=min(len(subquestions), 8)) as executor:
+        answers = list(executor.map(
+            lambda args: answer_subquestion(*args, doc_words_cache),
+            zip(subquestions, subq_embeds)
+        ))
 
     final_answer = "\n\n".join(answers)
     return "AskIDC: " + final_answer
@@ -0,0 +1,80 @@
+"""
+Text Matching Module
+
+Shared tokenizer and multi-phrase matcher for query handling, retrieval and
+VLM post-processing, so every module tokenizes and matches phrases the same way.
+"""
+
+import re
+from typing import Dict, Set
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # Fall back to one compiled regex alternation
+
+# Word tokens used for keyword sets and keyword scoring
+WORD_RE = re.compile(r'\w+')
+
+
+def word_set(text: str) -> Set[str]:
+    """Lowercased set of the word tokens in a text."""
+    return set(WORD_RE.findall(text.lower()))
+
+
+def _is_word_char(text: str, idx: int) -> bool:
+    """True if position idx holds a word character (as regex \\w sees it)."""
+    return 0 <= idx < len(text) and (text[idx].isalnum() or text[idx] == '_')
+
+
+class PhraseMatcher:
+    """
+    Finds which of a fixed set of phrases occur in a text in a single scan.
+    Uses one pyahocorasick automaton when available and an equivalent compiled
+    regex otherwise; both match case-insensitively and report every phrase found.
+    """
+
+    def __init__(self, phrases: Dict[str, str], whole_words: bool = False):
+        """
+        Build the matcher.
+
+        Args:
+            phrases: Mapping of phrase to the tag reported when it occurs
+            whole_words: Only match phrases bounded by non-word characters
+        """
+        self.tags = {phrase.lower(): tag for phrase, tag in phrases.items()}
+        self.whole_words = whole_words
+
+        # Regex fallback: a lookahead at every position so overlapping phrases are all found
+        boundary = r'\b' if whole_words else ''
+        alternation = '|'.join(re.escape(phrase) for phrase in sorted(self.tags, key=len, reverse=True))
+        self._pattern = re.compile(f"(?=({boundary}(?:{alternation}){boundary}))", re.IGNORECASE)
+
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for phrase, tag in self.tags.items():
+                self._automaton.add_word(phrase, (len(phrase), tag))
+            self._automaton.make_automaton()
+
+    def find(self, text: str) -> Set[str]:
+        """
+        Return the tags of every phrase that occurs in the text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of matched tags
+        """
+        if self._automaton is None:
+            return {self.tags[match.lower()] for match in self._pattern.findall(text) if match.lower() in self.tags}
+
+        text_lower = text.lower()
+        found = set()
+        for end, (length, tag) in self._automaton.iter(text_lower):
+            # The automaton matches substrings, so check the edges for whole-word phrases
+            if self.whole_words and (_is_word_char(text_lower, end - length) or _is_word_char(text_lower, end + 1)):
+                continue
+            found.add(tag)
+        return found
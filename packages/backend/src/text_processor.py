@@ -1,6 +1,11 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from config import CHUNK_SIZE, CHUNK_OVERLAP
 from typing import List, Dict
+import itertools
+import re
+from text_matching import WORD_RE
+
+_WS_RE = re.compile(r'\s+')
 
 def chunk_text(documents: List[Dict[str, str]]) -> List[Dict[str, str]]:
     """
@@ -11,7 +16,8 @@ def chunk_text(documents: List[Dict[str, str]]) -> List[Dict[str, str]]:
         documents: List of documents with 'text' and 'source' fields
         
     Returns:
-        List of text chunks with unique IDs, text content, and source information
+        List of text chunks with unique IDs, text content, source information and
+        the chunk's distinct lowercase word tokens (space-separated, for keyword scoring)
     """
     
     # Define text splitting hierarchy (try these separators in order)
@@ -33,29 +39,28 @@ def chunk_text(documents: List[Dict[str, str]]) -> List[Dict[str, str]]:
     )
     
     chunks = []
-    chunk_id_counter = 0
+    chunk_ids = itertools.count()  # Global chunk numbering across documents
     
     # Process each document
     for doc in documents:
         # Clean text by normalizing whitespace
-        cleaned_text = " ".join(doc["text"].split()).strip()
+        cleaned_text = _WS_RE.sub(' ', doc["text"]).strip()
         
         # Skip empty documents
         if not cleaned_text:
             print(f"Skipping empty document: {doc['source']}")
             continue
 
-        # Split document into chunks
-        doc_chunks = text_splitter.split_text(cleaned_text)
-        
-        # Create chunk objects with metadata
-        for chunk_text in doc_chunks:
-            chunks.append({
-                "id": f"chunk_{chunk_id_counter}",  # Unique identifier
-                "text": chunk_text,                   # Chunk content
-                "source": doc["source"]              # Original source file
-            })
-            chunk_id_counter += 1
+        # Split document into chunks and create chunk objects with metadata
+        chunks.extend(
+            {
+                "id": f"chunk_{next(chunk_ids)}",  # Unique identifier
+                "text": chunk_text,                 # Chunk content
+                "source": doc["source"],           # Original source file
+                "tokens": " ".join(sorted(set(WORD_RE.findall(chunk_text.lower()))))  # Keyword set
+            }
+            for chunk_text in text_splitter.split_text(cleaned_text)
+        )
     
     print(f"Created {len(chunks)} text chunks from {len(documents)} documents.")
     return chunks
@@ -1,11 +1,46 @@
 import os
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+import faiss
 from chromadb import PersistentClient
 from chromadb.utils import embedding_functions
-from config import CHROMA_DB_PATH, COLLECTION_NAME, EMBEDDING_MODEL_NAME
+from config import CHROMA_DB_PATH, COLLECTION_NAME, EMBEDDING_MODEL_NAME, CHROMA_HNSW_METADATA, FAISS_INT8_INDEX
 import numpy as np
-import re
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from text_matching import WORD_RE
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None  # Fall back to the NumPy expressions in VectorDBManager.rerank_scores
+
+_INT8_SCALE = 127.0
+
+logger = logging.getLogger(__name__)
+
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """Symmetric int8 quantization of L2-normalized vectors (components lie in [-1, 1])."""
+    return np.clip(np.round(np.asarray(vectors, dtype=np.float32) * _INT8_SCALE), -128, 127).astype(np.int8)
+
+
+if njit is not None:
+    @njit(fastmath=True, cache=True)
+    def _rerank_kernel(D, q, kw_scores, cos_out, final_out):
+        # One fused pass: dot product per document, then the 0.7/0.3 blend with the keyword score
+        n, d = D.shape
+        for i in range(n):
+            s = 0.0
+            for k in range(d):
+                s += D[i, k] * q[k]
+            cos_out[i] = s
+            final_out[i] = 0.7 * s + 0.3 * kw_scores[i]
+else:
+    _rerank_kernel = None
+
 
 class VectorDBManager:
     """
@@ -13,30 +48,52 @@ class VectorDBManager:
     Handles document embeddings, similarity search, and context retrieval for RAG.
     """
     
+    EMBEDDING_CACHE_MAX_ENTRIES = 10000
+    CHROMA_ADD_BATCH_SIZE = 512  # Rows per collection.add call during ingestion
+    
     def __init__(self):
         """Initialize ChromaDB client and embedding model."""
         self.client = PersistentClient(path=CHROMA_DB_PATH)
+        self.fingerprint_path = os.path.join(CHROMA_DB_PATH, "corpus_fingerprint")
         self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
             model_name=EMBEDDING_MODEL_NAME
         )
         self.collection = self._get_or_create_collection()
         # Initialize embedding model for similarity calculations
         self.embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        # LRU cache of normalized embeddings keyed on a hash of the text
+        self._emb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._emb_cache_lock = threading.Lock()
+
+        # int8 FAISS index mirroring the collection, built on ingestion or on first query
+        self.faiss_index = None
+        self._index_vectors: Optional[np.ndarray] = None  # Vectors for re-scoring (int8 or float32)
+        self._index_documents: List[str] = []
+        self._index_metadatas: List[Dict[str, Any]] = []
+        self._index_lock = threading.Lock()
+        self._faiss_build_lock = threading.Lock()  # One lazy build at a time
+        self._faiss_build_failed = False  # Stop retrying after a failed build; ChromaDB serves queries
 
     def _get_or_create_collection(self):
         """Initialize ChromaDB collection for document storage."""
         try:
             collection = self.client.get_or_create_collection(
                 name=COLLECTION_NAME,
-                embedding_function=self.embedding_function
+                embedding_function=self.embedding_function,
+                metadata=CHROMA_HNSW_METADATA
             )
             print(f"ChromaDB collection '{COLLECTION_NAME}' ready. Contains {collection.count()} documents.")
+
+            # HNSW settings are fixed when the index is built; existing collections keep theirs
+            existing_metadata = collection.metadata or {}
+            if any(existing_metadata.get(key) != value for key, value in CHROMA_HNSW_METADATA.items()):
+                print("Collection was built with different HNSW settings; re-ingest to apply the configured ones.")
             return collection
         except Exception as e:
             print(f"Error initializing ChromaDB collection: {e}")
             return None
 
-    def add_documents(self, embeddings: np.ndarray, chunks: List[Dict[str, Any]], force_reingestion: bool = True):
+    def add_documents(self, embeddings: np.ndarray, chunks: List[Dict[str, Any]], force_reingestion: bool = True) -> bool:
         """
         Add document chunks and their embeddings to ChromaDB collection.
         
@@ -44,49 +101,256 @@ class VectorDBManager:
             embeddings: Numpy array of document embeddings
             chunks: List of text chunks with metadata
             force_reingestion: Whether to recreate collection if it exists
+
+        Returns:
+            True if the collection holds the given chunks
         """
         if not self.collection:
             print("ERROR: ChromaDB collection not initialized.")
-            return
+            return False
 
         # Check if we need to re-ingest documents
         existing_count = self.collection.count()
         if existing_count > 0:
             if not force_reingestion:
                 print(f"Collection already contains {existing_count} documents. Use force_reingestion=True to recreate.")
-                return
+                return False
             else:
                 print(f"Recreating collection (was {existing_count} documents)...")
                 self.client.delete_collection(name=COLLECTION_NAME)
+                self.store_corpus_fingerprint(None)
                 self.collection = self.client.get_or_create_collection(
                     name=COLLECTION_NAME,
-                    embedding_function=self.embedding_function
+                    embedding_function=self.embedding_function,
+                    metadata=CHROMA_HNSW_METADATA
                 )
 
+        # Store unit-length vectors so scores can be read back as plain dot products
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(embeddings):
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
         # Prepare data for ChromaDB
         ids = [chunk["id"] for chunk in chunks]
         documents = [chunk["text"] for chunk in chunks]
-        metadatas = [{"source": chunk["source"]} for chunk in chunks]
+        metadatas = [
+            {"source": chunk["source"], "tokens": chunk["tokens"]} if "tokens" in chunk else {"source": chunk["source"]}
+            for chunk in chunks
+        ]
 
         try:
             if ids:
                 print(f"Adding {len(ids)} documents to ChromaDB...")
-                self.collection.add(
-                    embeddings=embeddings.tolist(),
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
+                # Insert in fixed-size batches so Chroma's internal copy stays bounded
+                batch_size = self.CHROMA_ADD_BATCH_SIZE
+                for start in range(0, len(ids), batch_size):
+                    end = start + batch_size
+                    self.collection.add(
+                        embeddings=embeddings[start:end],  # chromadb>=0.5.11 keeps numpy rows; no nested Python lists
+                        documents=documents[start:end],
+                        metadatas=metadatas[start:end],
+                        ids=ids[start:end]
+                    )
                 print(f"Successfully added {len(ids)} documents to ChromaDB.")
+                self._build_faiss_index(embeddings, documents, metadatas)
             else:
                 print("No documents to add to ChromaDB.")
+            return True
         except Exception as e:
             print(f"ERROR adding documents to ChromaDB: {e}")
+            return False
+
+    def load_corpus_fingerprint(self) -> Optional[str]:
+        """Fingerprint of the corpus last ingested into the collection, or None if unknown."""
+        try:
+            with open(self.fingerprint_path, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def store_corpus_fingerprint(self, fingerprint: Optional[str]):
+        """
+        Record which corpus the collection holds, so restarts can skip unchanged re-ingestion.
+
+        Args:
+            fingerprint: Corpus fingerprint (see response_cache.corpus_fingerprint), or None to clear it
+        """
+        try:
+            if fingerprint is None:
+                if os.path.exists(self.fingerprint_path):
+                    os.remove(self.fingerprint_path)
+                return
+            tmp_path = f"{self.fingerprint_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(fingerprint)
+            os.replace(tmp_path, self.fingerprint_path)
+        except OSError as e:
+            print(f"Error saving corpus fingerprint: {e}")
+
+    def _build_faiss_index(self, embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Build an in-memory HNSW index over int8 scalar-quantized embeddings.
+        Stores 1 byte per dimension instead of 4, so graph traversal moves a quarter of the data.
+        
+        Args:
+            embeddings: Normalized document embeddings
+            documents: Document texts, aligned with embeddings
+            metadatas: Document metadata, aligned with embeddings
+        """
+        if not FAISS_INT8_INDEX['enabled'] or len(documents) == 0:
+            return
+
+        try:
+            vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+            index = faiss.IndexHNSWSQ(
+                vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, FAISS_INT8_INDEX['M'], faiss.METRIC_INNER_PRODUCT
+            )
+            index.hnsw.efConstruction = FAISS_INT8_INDEX['ef_construction']
+            index.train(vectors)  # Learns per-dimension ranges for the int8 codes
+            index.add(vectors)
+            index.hnsw.efSearch = FAISS_INT8_INDEX['ef_search']
+
+            with self._index_lock:
+                self.faiss_index = index
+                self._index_vectors = quantize_int8(vectors) if FAISS_INT8_INDEX['int8_rescore_vectors'] else vectors
+                self._index_documents = list(documents)
+                self._index_metadatas = list(metadatas)
+            self._faiss_build_failed = False
+            print(f"Built int8 FAISS index with {index.ntotal} vectors.")
+        except Exception as e:
+            print(f"ERROR building FAISS index, falling back to ChromaDB search: {e}")
+            self.faiss_index = None
+            self._faiss_build_failed = True
+
+    def _ensure_faiss_index(self):
+        """
+        Build the FAISS index from the persisted ChromaDB collection if it is not built yet.
+        Attempted once: concurrent first queries wait for a single build, and after a failure
+        queries go straight to ChromaDB instead of reloading the whole collection each time.
+        """
+        if self.faiss_index is not None or self._faiss_build_failed or not FAISS_INT8_INDEX['enabled']:
+            return
+        with self._faiss_build_lock:
+            if self.faiss_index is not None or self._faiss_build_failed or not self.collection.count():
+                return
+            try:
+                stored = self.collection.get(include=['embeddings', 'documents', 'metadatas'])
+                self._build_faiss_index(np.asarray(stored['embeddings']), stored['documents'], stored['metadatas'])
+            except Exception as e:
+                print(f"ERROR loading embeddings from ChromaDB for FAISS index: {e}")
+                self._faiss_build_failed = True
+
+    def _faiss_query(self, query_embedding: np.ndarray, n_results: int,
+                     search_ef: Optional[int] = None) -> Optional[Dict[str, List]]:
+        """
+        Search the int8 FAISS index.
+        
+        Args:
+            query_embedding: Normalized query embedding
+            n_results: Number of hits to return
+            search_ef: Per-query HNSW candidate list size (defaults to the index's ef_search)
+        
+        Returns:
+            Results in ChromaDB query format (cosine distances) plus the re-scored 'similarities',
+            or None if the index is unavailable
+        """
+        self._ensure_faiss_index()
+        with self._index_lock:
+            if self.faiss_index is None:
+                return None
+            query_vector = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+            params = faiss.SearchParametersHNSW(efSearch=max(search_ef, n_results)) if search_ef else None
+            _, indices = self.faiss_index.search(query_vector, n_results, params=params)
+            hit_ids = indices[0][indices[0] >= 0]
+            
+            # Re-score the hits against their stored vectors in one batched matmul; these
+            # similarities are the semantic scores used downstream
+            rescored = self.batch_cosine(self._index_vectors[hit_ids], query_vector[0])
+            order = np.argsort(-rescored, kind='stable')
+            hits = [(int(hit_ids[i]), float(rescored[i])) for i in order]
+            return {
+                'similarities': [np.asarray([score for _, score in hits], dtype=np.float32)],
+                'documents': [[self._index_documents[idx] for idx, _ in hits]],
+                'metadatas': [[self._index_metadatas[idx] for idx, _ in hits]],
+                'distances': [[1.0 - score for _, score in hits]]
+            }
+
+    def _encode_normalized(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into L2-normalized embeddings, ready for dot-product cosine similarity."""
+        return self.embedding_model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+    def _encode_cached(self, text: str) -> np.ndarray:
+        """
+        Return the normalized embedding for a text, encoding it only on a cache miss.
+        
+        Args:
+            text: Text to encode
+            
+        Returns:
+            Normalized embedding vector
+        """
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+        with self._emb_cache_lock:
+            embedding = self._emb_cache.get(key)
+            if embedding is not None:
+                self._emb_cache.move_to_end(key)
+                return embedding
+        
+        embedding = self._encode_normalized([text])[0]
+        with self._emb_cache_lock:
+            self._emb_cache[key] = embedding
+            while len(self._emb_cache) > self.EMBEDDING_CACHE_MAX_ENTRIES:
+                self._emb_cache.popitem(last=False)
+        return embedding
 
     def cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
-        """Calculate cosine similarity between two embedding vectors."""
-        vec1, vec2 = np.array(vec1), np.array(vec2)
-        return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+        """
+        Calculate cosine similarity between two embedding vectors.
+        Both vectors must already be L2-normalized (see _encode_normalized), so cosine is a plain dot product.
+        """
+        return float(np.dot(vec1, vec2))
+
+    def batch_cosine(self, D: np.ndarray, q: np.ndarray, normalized: bool = True) -> np.ndarray:
+        """
+        Cosine similarity of every row of D against q in a single BLAS call.
+        
+        Args:
+            D: Document embeddings of shape (n, d), float or int8-quantized (see quantize_int8)
+            q: Query embedding of shape (d,)
+            normalized: Whether D and q are already L2-normalized
+            
+        Returns:
+            Similarities of shape (n,)
+        """
+        if D.dtype == np.int8:
+            # Integer matmul on the quantized codes, rescaled back to cosine
+            return (D.astype(np.int32) @ quantize_int8(q).astype(np.int32)) / (_INT8_SCALE * _INT8_SCALE)
+        if normalized:
+            return D @ q
+        return np.einsum('ij,j->i', D, q) / (np.linalg.norm(D, axis=1) * np.linalg.norm(q))
+
+    def rerank_scores(self, D: np.ndarray, q: np.ndarray, kw_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Semantic and combined (0.7 semantic + 0.3 keyword) scores for retrieved documents.
+        
+        Args:
+            D: Normalized document embeddings of shape (n, d)
+            q: Normalized query embedding of shape (d,)
+            kw_scores: Keyword match scores of shape (n,)
+            
+        Returns:
+            Tuple of (semantic scores, combined scores)
+        """
+        if _rerank_kernel is None:
+            cos_sims = self.batch_cosine(D, q)
+            return cos_sims, (0.7 * cos_sims) + (0.3 * kw_scores)
+        
+        D = np.ascontiguousarray(D, dtype=np.float32)
+        cos_sims = np.empty(D.shape[0], dtype=np.float32)
+        final_scores = np.empty(D.shape[0], dtype=np.float32)
+        _rerank_kernel(D, np.ascontiguousarray(q, dtype=np.float32), np.ascontiguousarray(kw_scores, dtype=np.float32),
+                       cos_sims, final_scores)
+        return cos_sims, final_scores
 
     def keyword_match_score(self, query: str, doc_text: str) -> float:
         """
@@ -100,13 +364,27 @@ class VectorDBManager:
         Returns:
             float: Keyword match score between 0.0 and 1.0
         """
-        # Extract words from query and document (case-insensitive)
-        query_words = set(re.findall(r'\w+', query.lower()))
-        doc_words = set(re.findall(r'\w+', doc_text.lower()))
+        # Extract words from query (case-insensitive)
+        return self._kw_score_given_qwords(set(WORD_RE.findall(query.lower())), doc_text)
+
+    def _kw_score_given_qwords(self, query_words: set, doc_text: str, metadata: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Keyword matching score for an already tokenized query.
         
+        Args:
+            query_words: Lowercase query words
+            doc_text: Document text content
+            metadata: Document metadata; its 'tokens' field (stored at ingest) avoids re-tokenizing the text
+            
+        Returns:
+            float: Keyword match score between 0.0 and 1.0
+        """
         if not query_words:
             return 0.0
         
+        tokens = (metadata or {}).get("tokens")
+        doc_words = set(tokens.split()) if tokens is not None else set(WORD_RE.findall(doc_text.lower()))
+        
         # Calculate how much of the query is covered by the document
         overlap = len(query_words & doc_words)
         query_coverage = overlap / len(query_words)
@@ -114,13 +392,18 @@ class VectorDBManager:
         # Boost score for better query coverage (max 1.0)
         return min(query_coverage * 1.5, 1.0)
 
-    def retrieve_context(self, query: str, n_results: int = 5) -> List[str]:
+    def retrieve_context(self, query: str, n_results: int = 5, search_ef: Optional[int] = None,
+                         query_embedding: Optional[np.ndarray] = None) -> List[str]:
         """
         Retrieve relevant document chunks from ChromaDB based on semantic and keyword similarity.
         
         Args:
             query: User's search query
             n_results: Maximum number of documents to retrieve
+            search_ef: HNSW candidate list size for this query; higher trades latency for recall
+                (applies to the FAISS index; ChromaDB uses the collection's hnsw:search_ef)
+            query_embedding: Embedding of the query already computed by the caller with the same
+                model (e.g. for the semantic response cache); encoded here when not given
             
         Returns:
             List of formatted context strings containing source and content
@@ -129,63 +412,78 @@ class VectorDBManager:
             print("ERROR: ChromaDB collection not initialized.")
             return []
 
+        # Per-document score reports are debug output; skip all of their formatting otherwise
+        debug = logger.isEnabledFor(logging.DEBUG)
         try:
-            print(f"\nSearching for: '{query}'")
-            print("=" * 60)
+            if debug:
+                logger.debug("Searching for: '%s'", query)
             
-            # Get semantic similarity results from ChromaDB
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances']
-            )
+            # Get query embedding for search and cosine similarity calculation, reusing the caller's if given
+            if query_embedding is None:
+                query_embedding = self._encode_cached(query)
+            else:
+                query_embedding = np.array(query_embedding, dtype=np.float32).reshape(-1)
+                query_embedding /= max(float(np.linalg.norm(query_embedding)), 1e-12)
+
+            # Get semantic similarity results from the int8 FAISS index, or ChromaDB if unavailable
+            results = self._faiss_query(query_embedding, n_results, search_ef)
+            if results is None:
+                # Pass the embedding already computed above so Chroma does not encode the query again
+                results = self.collection.query(
+                    query_embeddings=[query_embedding.tolist()],
+                    n_results=n_results,
+                    include=['documents', 'metadatas', 'distances', 'embeddings']
+                )
             
             context = []
             if results and results['documents'] and results['documents'][0]:
-                print(f"Found {len(results['documents'][0])} relevant documents:")
-                print("-" * 40)
+                if debug:
+                    logger.debug("Found %d relevant documents", len(results['documents'][0]))
                 
-                # Get query embedding for cosine similarity calculation
-                query_embedding = self.embedding_model.encode([query])[0]
+                # Keyword scores (they feed the re-ranking below), tokenizing the query once for all documents
+                query_words = set(WORD_RE.findall(query.lower()))
+                kw_scores = np.array([
+                    self._kw_score_given_qwords(query_words, doc_text, metadata)
+                    for doc_text, metadata in zip(results['documents'][0], results['metadatas'][0])
+                ], dtype=np.float32)
                 
-                for i, doc_text in enumerate(results['documents'][0]):
+                # Combine scores (semantic similarity weighted higher)
+                if 'similarities' in results:
+                    # FAISS hits were already re-scored against their stored vectors
+                    cos_sims = results['similarities'][0]
+                    final_scores = (0.7 * cos_sims) + (0.3 * kw_scores)
+                else:
+                    # ChromaDB: score the returned normalized vectors in one fused pass
+                    # (older collections may use l2 distances, so distances are not reused)
+                    doc_embeddings = np.asarray(results['embeddings'][0], dtype=np.float32)
+                    cos_sims, final_scores = self.rerank_scores(doc_embeddings, query_embedding, kw_scores)
+                
+                # Re-rank: context goes to the LLM best combined score first
+                order = np.argsort(-np.asarray(final_scores), kind='stable')
+                for rank, i in enumerate(order, 1):
+                    doc_text = results['documents'][0][i]
                     source = results['metadatas'][0][i]['source']
                     
-                    # Calculate semantic similarity
-                    doc_embedding = self.embedding_model.encode([doc_text])[0]
-                    cos_sim = self.cosine_similarity(query_embedding, doc_embedding)
-                    
-                    # Calculate keyword matching score
-                    kw_score = self.keyword_match_score(query, doc_text)
-                    
-                    # Combine scores (semantic similarity weighted higher)
-                    final_score = (0.7 * cos_sim) + (0.3 * kw_score)
-                    
-                    # Display scoring details
-                    print(f"Document {i+1}:")
-                    print(f"   Source: {os.path.basename(source)}")
-                    print(f"   Semantic Score: {cos_sim:.4f}")
-                    print(f"   Keyword Score: {kw_score:.4f}")
-                    print(f"   Combined Score: {final_score:.4f}")
-                    print(f"   Preview: {doc_text[:100]}...")
-                    print("-" * 40)
+                    # Scoring details, including where the vector search had placed the document
+                    if debug:
+                        logger.debug(
+                            "Rank %d (search rank %d): source=%s semantic=%.4f keyword=%.4f combined=%.4f preview=%s...",
+                            rank, i + 1, os.path.basename(source), cos_sims[i], kw_scores[i], final_scores[i],
+                            doc_text[:100]
+                        )
                     
                     # Format context for LLM
                     context.append(f"Source: {source}\nContent: {doc_text}")
                 
-                # Display summary statistics
-                cos_sims = [self.cosine_similarity(query_embedding, self.embedding_model.encode([doc])[0]) 
-                           for doc in results['documents'][0]]
-                kw_scores = [self.keyword_match_score(query, doc) for doc in results['documents'][0]]
-                
-                print(f"Summary Statistics:")
-                print(f"   Avg Semantic Score: {np.mean(cos_sims):.4f}")
-                print(f"   Avg Keyword Score: {np.mean(kw_scores):.4f}")
-                print(f"   Best Match Score: {np.max(cos_sims):.4f}")
-                print("=" * 60)
+                # Summary statistics
+                if debug:
+                    logger.debug(
+                        "Summary: avg semantic=%.4f avg keyword=%.4f best match=%.4f",
+                        np.mean(cos_sims), np.mean(kw_scores), np.max(cos_sims)
+                    )
                 
-            else:
-                print("No relevant documents found.")
+            elif debug:
+                logger.debug("No relevant documents found for: '%s'", query)
                 
             return context
             
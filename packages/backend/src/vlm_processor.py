@@ -6,13 +6,49 @@ image analysis, particularly for partner logo recognition and complex visual con
 """
 
 import io
+import re
+import json
 import base64
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional
 from PIL import Image
 
 # Google Gemini imports (reusing existing integration)
 import google.generativeai as genai
 from config import GEMINI_API_KEY, GEMINI_MODEL_NAME, PPTX_PROCESSING
+from text_matching import PhraseMatcher
+
+# Common partner indicators looked for in VLM responses and OCR text
+VLM_PARTNER_KEYWORDS = [
+    'microsoft', 'aws', 'amazon', 'google', 'oracle', 'salesforce',
+    'ibm', 'azure', 'snowflake', 'redington', 'wipro', 'infosys',
+    'accenture', 'dell', 'hp', 'cisco', 'vmware', 'meta', 'facebook'
+]
+OCR_PARTNER_KEYWORDS = [
+    'microsoft', 'aws', 'amazon', 'google', 'oracle', 'salesforce',
+    'ibm', 'azure', 'snowflake', 'redington', 'wipro', 'infosys'
+]
+_VLM_PARTNER_MATCHER = PhraseMatcher({keyword: keyword for keyword in VLM_PARTNER_KEYWORDS}, whole_words=True)
+_OCR_PARTNER_MATCHER = PhraseMatcher({keyword: keyword for keyword in OCR_PARTNER_KEYWORDS}, whole_words=True)
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
+def find_partner_keywords(matcher: PhraseMatcher, keywords: List[str], text: str) -> List[str]:
+    """
+    Return the keywords that occur in a text as whole words.
+    
+    Args:
+        matcher: Whole-word PhraseMatcher over the keywords
+        keywords: Keyword list, which sets the order of the result
+        text: Text to scan
+        
+    Returns:
+        Matched keywords in keyword-list order
+    """
+    found = matcher.find(text)
+    return [keyword for keyword in keywords if keyword in found]
 
 
 class GeminiVLMProcessor:
@@ -21,9 +57,14 @@ class GeminiVLMProcessor:
     Leverages the existing Gemini integration from llm_manager.py
     """
     
+    VLM_CACHE_MAX_ENTRIES = 1000
+    
     def __init__(self):
         self.model = None
         self.config = PPTX_PROCESSING
+        # LRU cache of analysis results keyed on the analysis type and image content hash
+        self._vlm_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._vlm_cache_lock = threading.Lock()
         self._initialize_gemini_vision()
     
     def _initialize_gemini_vision(self):
@@ -55,6 +96,11 @@ class GeminiVLMProcessor:
         if not self.model:
             return self._create_error_result("Gemini VLM not initialized", metadata)
         
+        cache_key = self._cache_key('partners', pil_image)
+        cached = self._get_cached(cache_key, metadata)
+        if cached is not None:
+            return cached
+        
         try:
             # Prepare the prompt for partner detection
             partner_prompt = self._create_partner_analysis_prompt(metadata)
@@ -66,7 +112,9 @@ class GeminiVLMProcessor:
             response = self.model.generate_content([partner_prompt, image_data])
             
             # Parse response
-            return self._parse_partner_response(response, metadata)
+            result = self._parse_partner_response(response, metadata)
+            self._store_cached(cache_key, result)
+            return result
             
         except Exception as e:
             print(f"Error in Gemini VLM partner analysis: {e}")
@@ -86,6 +134,11 @@ class GeminiVLMProcessor:
         if not self.model:
             return self._create_error_result("Gemini VLM not initialized", metadata)
         
+        cache_key = self._cache_key('text', pil_image)
+        cached = self._get_cached(cache_key, metadata)
+        if cached is not None:
+            return cached
+        
         try:
             # Prepare text extraction prompt
             text_prompt = self._create_text_extraction_prompt(metadata)
@@ -97,12 +150,41 @@ class GeminiVLMProcessor:
             response = self.model.generate_content([text_prompt, image_data])
             
             # Parse response
-            return self._parse_text_response(response, metadata)
+            result = self._parse_text_response(response, metadata)
+            self._store_cached(cache_key, result)
+            return result
             
         except Exception as e:
             print(f"Error in Gemini VLM text analysis: {e}")
             return self._create_error_result(str(e), metadata)
     
+    @staticmethod
+    def _cache_key(analysis_type: str, pil_image: Image.Image) -> str:
+        """Cache key from the analysis type and a hash of the decoded pixels, size and mode."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{analysis_type}:{pil_image.mode}:{pil_image.size}".encode('utf-8'))
+        digest.update(pil_image.tobytes())
+        return digest.hexdigest()
+    
+    def _get_cached(self, cache_key: str, metadata: Dict) -> Optional[Dict]:
+        """Return a cached result re-tagged with this image's metadata, or None on a miss."""
+        with self._vlm_cache_lock:
+            result = self._vlm_cache.get(cache_key)
+            if result is None:
+                return None
+            self._vlm_cache.move_to_end(cache_key)
+        return {**result, 'metadata': metadata}
+    
+    def _store_cached(self, cache_key: str, result: Dict):
+        """Cache a successful result, evicting the least recently used entry if full."""
+        if 'error' in result:
+            return
+        with self._vlm_cache_lock:
+            self._vlm_cache[cache_key] = result
+            self._vlm_cache.move_to_end(cache_key)
+            while len(self._vlm_cache) > self.VLM_CACHE_MAX_ENTRIES:
+                self._vlm_cache.popitem(last=False)
+    
     def _create_partner_analysis_prompt(self, metadata: Dict) -> str:
         """Create a specialized prompt for partner logo recognition."""
         slide_context = f"slide {metadata.get('slide_number', 'unknown')}"
@@ -155,17 +237,24 @@ Return the extracted text in clean, readable format. If no text is visible, retu
     
     def _pil_to_gemini_format(self, pil_image: Image.Image):
         """Convert PIL Image to format suitable for Gemini API."""
+        # Downscale large slide images to the model's effective input size before encoding
+        max_size = self.config['max_image_size']
+        if pil_image.width > max_size[0] or pil_image.height > max_size[1]:
+            # thumbnail resizes in place, so work on a copy and leave the caller's image intact
+            pil_image = pil_image.copy()
+            pil_image.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        
         # Convert to RGB if needed
         if pil_image.mode != 'RGB':
             pil_image = pil_image.convert('RGB')
         
-        # Convert to bytes
+        # JPEG encodes far faster than PNG's zlib pass and is several times smaller
         img_byte_arr = io.BytesIO()
-        pil_image.save(img_byte_arr, format='PNG')
+        pil_image.save(img_byte_arr, format='JPEG', quality=85, optimize=False)
         img_byte_arr = img_byte_arr.getvalue()
         
         return {
-            "mime_type": "image/png",
+            "mime_type": "image/jpeg",
             "data": img_byte_arr
         }
     
@@ -207,11 +296,8 @@ Return the extracted text in clean, readable format. If no text is visible, retu
     
     def _extract_partner_info_from_text(self, response_text: str) -> Dict:
         """Extract structured partner information from VLM response."""
-        import json
-        import re
-        
         # Try to find JSON in the response
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        json_match = _JSON_OBJECT_RE.search(response_text)
         if json_match:
             try:
                 return json.loads(json_match.group())
@@ -219,24 +305,11 @@ Return the extracted text in clean, readable format. If no text is visible, retu
                 pass
         
         # Fallback: parse text manually for partner names
-        partners_found = []
-        
-        # Common partner indicators
-        partner_keywords = [
-            'microsoft', 'aws', 'amazon', 'google', 'oracle', 'salesforce',
-            'ibm', 'azure', 'snowflake', 'redington', 'wipro', 'infosys',
-            'accenture', 'dell', 'hp', 'cisco', 'vmware', 'meta', 'facebook'
+        partners_found = [
+            {'name': keyword.title(), 'type': 'text_detection', 'confidence': 'medium'}
+            for keyword in find_partner_keywords(_VLM_PARTNER_MATCHER, VLM_PARTNER_KEYWORDS, response_text)
         ]
         
-        response_lower = response_text.lower()
-        for keyword in partner_keywords:
-            if keyword in response_lower:
-                partners_found.append({
-                    'name': keyword.title(),
-                    'type': 'text_detection',
-                    'confidence': 'medium'
-                })
-        
         return {
             'partners_found': partners_found,
             'partnership_text': response_text,
@@ -318,24 +391,10 @@ class HybridVLMProcessor:
     
     def _extract_partners_from_ocr_text(self, ocr_text: str) -> List[Dict]:
         """Extract partner names from OCR text."""
-        partners = []
-        
-        # Common partner keywords in OCR text
-        partner_keywords = [
-            'microsoft', 'aws', 'amazon', 'google', 'oracle', 'salesforce',
-            'ibm', 'azure', 'snowflake', 'redington', 'wipro', 'infosys'
+        return [
+            {'name': keyword.title(), 'type': 'ocr_text', 'confidence': 'high'}
+            for keyword in find_partner_keywords(_OCR_PARTNER_MATCHER, OCR_PARTNER_KEYWORDS, ocr_text)
         ]
-        
-        ocr_text_lower = ocr_text.lower()
-        for keyword in partner_keywords:
-            if keyword in ocr_text_lower:
-                partners.append({
-                    'name': keyword.title(),
-                    'type': 'ocr_text',
-                    'confidence': 'high'
-                })
-        
-        return partners
     
     def _calculate_combined_confidence(self, ocr_result: Dict, vlm_result: Dict) -> str:
         """Calculate overall confidence from combined results."""
@@ -356,6 +415,24 @@ class HybridVLMProcessor:
             return 'low'
 
 
+# Shared processor for the utility function, created once per process on first use
+_shared_processor = None
+_shared_processor_lock = threading.Lock()
+
+
+def _get_processor() -> HybridVLMProcessor:
+    """
+    Return the shared HybridVLMProcessor.
+    Building one configures Gemini and creates the model, so it is done once rather than per image.
+    """
+    global _shared_processor
+    if _shared_processor is None:
+        with _shared_processor_lock:
+            if _shared_processor is None:
+                _shared_processor = HybridVLMProcessor()
+    return _shared_processor
+
+
 # Utility function for integration
 def analyze_pptx_image_with_vlm(pil_image: Image.Image, metadata: Dict) -> Dict:
     """
@@ -368,8 +445,7 @@ def analyze_pptx_image_with_vlm(pil_image: Image.Image, metadata: Dict) -> Dict:
     Returns:
         VLM analysis result
     """
-    processor = HybridVLMProcessor()
-    return processor.process_image_for_partners(pil_image, metadata)
+    return _get_processor().process_image_for_partners(pil_image, metadata)
 
 
 if __name__ == "__main__":
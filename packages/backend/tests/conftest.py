@@ -0,0 +1,8 @@
+"""
+Shared pytest setup: backend modules are flat files in src/ imported by name.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
@@ -0,0 +1,75 @@
+import sqlite3
+
+from db import SCHEMA_VERSION, ConnectionPool, initialize_database
+
+
+def test_pool_checkout_and_return(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    with pool.acquire() as first, pool.acquire() as second:
+        assert first is not second
+        assert pool._pool.empty()
+    assert pool._pool.qsize() == 2
+
+    # Connections are reused rather than reopened
+    with pool.acquire() as conn:
+        assert conn in (first, second)
+    pool.close_all()
+
+
+def test_pool_rolls_back_open_transaction_on_return(tmp_path):
+    db_path = str(tmp_path / "pool.db")
+    initialize_database(db_path)
+    pool = ConnectionPool(db_path, size=1)
+
+    with pool.acquire() as conn:
+        conn.execute("INSERT INTO users (name, email) VALUES ('a', 'a@example.com')")
+        assert conn.in_transaction
+
+    with pool.acquire() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+    pool.close_all()
+
+
+def test_pool_connections_use_row_factory(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    with pool.acquire() as conn:
+        row = conn.execute("SELECT 1 AS one").fetchone()
+    assert row["one"] == 1
+    pool.close_all()
+
+
+def test_initialize_database_sets_schema_version(tmp_path):
+    db_path = str(tmp_path / "chat.db")
+    initialize_database(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        assert {"users", "conversations", "chat_memory"} <= tables
+    finally:
+        conn.close()
+
+
+def test_initialize_database_skips_current_schema(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "chat.db")
+    initialize_database(db_path)
+
+    calls = []
+    monkeypatch.setattr("db.create_advanced_schema", lambda path=None: calls.append(path) or True)
+    initialize_database(db_path)
+    assert calls == []
+
+
+def test_initialize_database_leaves_version_unset_on_failure(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "chat.db")
+    monkeypatch.setattr("db.create_advanced_schema", lambda path=None: False)
+    initialize_database(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    finally:
+        conn.close()
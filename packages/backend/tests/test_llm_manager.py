@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from llm_manager import ConversationMemory
+
+
+def test_memory_keeps_recent_turns_in_order():
+    memory = ConversationMemory(max_turns=2)
+    memory.save("q1", "a1")
+    memory.save("q2", "a2")
+
+    assert memory.to_gemini() == [
+        {"role": "user", "parts": [{"text": "q1"}]},
+        {"role": "model", "parts": [{"text": "a1"}]},
+        {"role": "user", "parts": [{"text": "q2"}]},
+        {"role": "model", "parts": [{"text": "a2"}]},
+    ]
+    assert memory.summary() == ""
+
+
+def test_memory_summarizes_evicted_questions():
+    memory = ConversationMemory(max_turns=2, max_summary_topics=2)
+    for i in range(1, 5):
+        memory.save(f"q{i}", f"a{i}")
+
+    assert list(memory.turns) == [("q3", "a3"), ("q4", "a4")]
+    assert memory.summary() == "Earlier in this conversation the user asked about: q1; q2"
+
+    memory.save("q5", "a5")
+    assert memory.summary() == "Earlier in this conversation the user asked about: q2; q3"
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("pptx")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+from pptx_processor import parse_tesseract_config
+
+
+def test_parse_tesseract_config_defaults():
+    assert parse_tesseract_config("") == {
+        'lang': 'eng', 'psm': None, 'oem': None, 'tessdata_dir': None, 'variables': {}, 'unsupported': []
+    }
+
+
+def test_parse_tesseract_config_options():
+    parsed = parse_tesseract_config("--oem 3 --psm 6 -l eng+deu --tessdata-dir '/opt/tess data'")
+    assert parsed['oem'] == 3
+    assert parsed['psm'] == 6
+    assert parsed['lang'] == 'eng+deu'
+    assert parsed['tessdata_dir'] == '/opt/tess data'
+    assert parsed['unsupported'] == []
+
+
+def test_parse_tesseract_config_variables():
+    parsed = parse_tesseract_config("-c preserve_interword_spaces=1 -c tessedit_char_whitelist=a=b")
+    assert parsed['variables'] == {'preserve_interword_spaces': '1', 'tessedit_char_whitelist': 'a=b'}
+
+
+def test_parse_tesseract_config_collects_unsupported_tokens():
+    parsed = parse_tesseract_config("--dpi 300 --psm 6 -c novalue --psm")
+    assert parsed['psm'] == 6
+    assert parsed['unsupported'] == ['--dpi', '300', '-c', 'novalue', '--psm']
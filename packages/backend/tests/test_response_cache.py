@@ -0,0 +1,152 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+from response_cache import (
+    ExactResponseCache, SemanticResponseCache, corpus_fingerprint, fcntl, is_context_dependent, normalize_query
+)
+
+
+@pytest.mark.parametrize("query", [
+    "What IT services does IDC offer?",
+    "What is IT staffing?",
+    "Tell me about IDC and its services",
+    "How can I contact IDC? I need their email",
+    "Where are IDC's offices located?",
+])
+def test_first_turn_questions_are_not_context_dependent(query):
+    assert not is_context_dependent(query)
+
+
+@pytest.mark.parametrize("query", [
+    "Tell me more",
+    "Can you elaborate?",
+    "What about India?",
+    "Explain further please",
+    "You mentioned staffing, how does that work?",
+])
+def test_follow_ups_are_context_dependent(query):
+    assert is_context_dependent(query)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("How do I contact IDC?", "how do i contact idc"),
+    ("how do i  contact idc", "how do i contact idc"),
+    ("  What IT services does IDC offer?!  ", "what it services does idc offer"),
+    ("Where\tare\nthe offices...", "where are the offices"),
+])
+def test_normalize_query(query, expected):
+    assert normalize_query(query) == expected
+
+
+def test_exact_cache_evicts_least_recently_used():
+    cache = ExactResponseCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_exact_cache_invalidate():
+    cache = ExactResponseCache(max_entries=4)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.invalidate("a")
+    assert cache.get("a") is None and cache.get("b") == "B"
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def _unit(dimension, axis):
+    vector = np.zeros(dimension, dtype=np.float32)
+    vector[axis] = 1.0
+    return vector
+
+
+def _semantic_cache(cache_dir, **kwargs):
+    return SemanticResponseCache(4, threshold=0.9, cache_dir=str(cache_dir), **kwargs)
+
+
+def _release(cache):
+    """Flush and drop the owner lock so another instance can own the directory."""
+    cache.flush()
+    if cache._owner_lock_file is not None:
+        cache._owner_lock_file.close()
+
+
+def test_semantic_cache_lookup_threshold(tmp_path):
+    cache = _semantic_cache(tmp_path, max_entries=4, flush_every=100)
+    cache.add(_unit(4, 0), "zero")
+
+    assert cache.lookup(_unit(4, 0)) == "zero"
+    assert cache.lookup(_unit(4, 1)) is None
+
+
+def test_semantic_cache_evicts_least_recently_used(tmp_path):
+    cache = _semantic_cache(tmp_path, max_entries=2, flush_every=100)
+    cache.add(_unit(4, 0), "zero")
+    cache.add(_unit(4, 1), "one")
+    assert cache.lookup(_unit(4, 0)) == "zero"  # "one" is now the least recently used
+    cache.add(_unit(4, 2), "two")
+
+    assert len(cache) == 2
+    assert cache.lookup(_unit(4, 1)) is None
+    assert cache.lookup(_unit(4, 0)) == "zero"
+    assert cache.lookup(_unit(4, 2)) == "two"
+
+
+def test_semantic_cache_persistence_round_trip(tmp_path):
+    cache = _semantic_cache(tmp_path, max_entries=2, flush_every=100)
+    cache.set_corpus_fingerprint("corpus-a")
+    cache.add(_unit(4, 0), "zero")
+    cache.add(_unit(4, 1), "one")
+    cache.add(_unit(4, 2), "two")  # Evicts "zero", forcing a log rewrite
+    _release(cache)
+
+    reloaded = _semantic_cache(tmp_path, max_entries=2, flush_every=100)
+    assert reloaded.is_owner
+    assert reloaded.corpus_fingerprint == "corpus-a"
+    assert reloaded.responses == ["one", "two"]
+    assert reloaded.lookup(_unit(4, 1)) == "one"
+    assert reloaded.lookup(_unit(4, 2)) == "two"
+    assert reloaded.lookup(_unit(4, 0)) is None
+
+
+def test_semantic_cache_second_process_does_not_write(tmp_path):
+    owner = _semantic_cache(tmp_path)
+    reader = _semantic_cache(tmp_path)
+    assert owner.is_owner
+    assert not reader.is_owner or fcntl is None
+
+
+def test_fingerprint_change_clears_cache(tmp_path):
+    cache = _semantic_cache(tmp_path, flush_every=1)
+    cache.set_corpus_fingerprint("corpus-a")
+    cache.add(_unit(4, 0), "zero")
+
+    cache.set_corpus_fingerprint("corpus-a")
+    assert cache.lookup(_unit(4, 0)) == "zero"
+
+    cache.set_corpus_fingerprint("corpus-b")
+    assert len(cache) == 0
+    assert cache.lookup(_unit(4, 0)) is None
+    _release(cache)
+
+    # The cleared state is what gets persisted
+    reloaded = _semantic_cache(tmp_path)
+    assert reloaded.corpus_fingerprint == "corpus-b"
+    assert len(reloaded) == 0
+
+
+def test_corpus_fingerprint_tracks_ids_and_text():
+    chunks = [{"id": "a", "text": "alpha"}, {"id": "b", "text": "beta"}]
+    assert corpus_fingerprint(chunks) == corpus_fingerprint([dict(c) for c in chunks])
+    assert corpus_fingerprint(chunks) != corpus_fingerprint([chunks[0], {"id": "b", "text": "gamma"}])
+    assert corpus_fingerprint(chunks) != corpus_fingerprint([chunks[0], {"id": "c", "text": "beta"}])
+    # Field separators keep "ab"+"c" distinct from "a"+"bc"
+    assert corpus_fingerprint([{"id": "ab", "text": "c"}]) != corpus_fingerprint([{"id": "a", "text": "bc"}])
@@ -0,0 +1,44 @@
+import pytest
+
+import text_matching
+from text_matching import PhraseMatcher, word_set
+
+
+@pytest.fixture(params=["automaton", "regex"])
+def matcher_backend(request, monkeypatch):
+    """Run each test against both the pyahocorasick and the regex fallback paths."""
+    if request.param == "automaton":
+        if text_matching.ahocorasick is None:
+            pytest.skip("pyahocorasick not installed")
+    else:
+        monkeypatch.setattr(text_matching, "ahocorasick", None)
+    return request.param
+
+
+def test_word_set_lowercases_and_splits():
+    assert word_set("IDC Technologies, IDC's staffing!") == {"idc", "technologies", "s", "staffing"}
+
+
+def test_finds_every_tag_case_insensitively(matcher_backend):
+    matcher = PhraseMatcher({
+        "idc contact": "contact", "contact information": "contact",
+        "about idc": "about", "who are you": "about"
+    })
+    assert matcher.find("IDC Contact Information, and about IDC") == {"contact", "about"}
+    assert matcher.find("What services do you offer?") == set()
+
+
+def test_overlapping_phrases_are_all_found(matcher_backend):
+    matcher = PhraseMatcher({"idc contact": "a", "contact information": "b"})
+    assert matcher.find("idc contact information") == {"a", "b"}
+
+
+def test_substring_matching_by_default(matcher_backend):
+    matcher = PhraseMatcher({"contact": "contact"})
+    assert matcher.find("contacting idc") == {"contact"}
+
+
+def test_whole_words_rejects_partial_matches(matcher_backend):
+    matcher = PhraseMatcher({k: k for k in ["hp", "meta", "aws"]}, whole_words=True)
+    assert matcher.find("php metadata AWS, HP") == {"aws", "hp"}
+    assert matcher.find("meta") == {"meta"}
@@ -59,7 +59,7 @@ export default function Chatbot() {
 		setIsLoading(true);
 
 		try {
-			const response = await fetch(`${apiUrl}/chat`, {
+			const response = await fetch(`${apiUrl}/chat/stream`, {
 				method: "POST",
 				headers: { "Content-Type": "application/json" },
 				// Include user details in the request body
@@ -68,13 +68,48 @@ export default function Chatbot() {
 					email: userEmail ,
 				}),
 			});
-			const data = await response.json();
-			const botMessage: Message = {
-				id: Date.now() + 1,
-				text: data.response || "Sorry, I didn’t understand that.",
-				from: "bot",
-			};
-			setChatMessages(prev => [...prev, botMessage]);
+
+			// Read the Server-Sent Events stream and grow the bot message as chunks arrive
+			const botMessageId = Date.now() + 1;
+			let botText = "";
+			if (response.ok && response.body) {
+				const reader = response.body.getReader();
+				const decoder = new TextDecoder();
+				let buffer = "";
+				while (true) {
+					const { done, value } = await reader.read();
+					if (done) break;
+					buffer += decoder.decode(value, { stream: true });
+					const events = buffer.split("\n\n");
+					buffer = events.pop() ?? "";
+					for (const event of events) {
+						if (!event.startsWith("data: ")) continue;
+						const payload = JSON.parse(event.slice(6));
+						if (!payload.delta) continue;
+
+						const isFirstChunk = botText === "";
+						botText += payload.delta;
+						const text = botText;
+						if (isFirstChunk) {
+							setIsLoading(false);
+							setChatMessages(prev => [...prev, { id: botMessageId, text, from: "bot" }]);
+						} else {
+							setChatMessages(prev =>
+								prev.map(message => (message.id === botMessageId ? { ...message, text } : message))
+							);
+						}
+					}
+				}
+			}
+
+			if (!botText) {
+				const botMessage: Message = {
+					id: botMessageId,
+					text: "Sorry, I didn’t understand that.",
+					from: "bot",
+				};
+				setChatMessages(prev => [...prev, botMessage]);
+			}
 		} catch (error) {
 			console.error("Error fetching response:", error);
 			const errorMessage: Message = {